@@ -0,0 +1,282 @@
+"""Batch game analysis: every move of every game searched, judged and written as JSONL.
+
+Games are fanned out to a pool of worker processes, one game per job, and
+each worker searches every position at a fixed depth or node budget.
+Results come back in input order with at most --queue games in flight, so
+memory does not grow with the input. Each game is one output line, flushed
+as soon as it is written; after a crash, --resume carries on from the
+first game missing from the output.
+
+Usage:
+    python -m Rules.analysis games.pgn -o analysis.jsonl --depth 5 --workers 8
+    python -m Rules.analysis pgn_dir/ -o analysis.jsonl --nodes 20000 --resume
+"""
+
+import argparse
+import json
+import math
+import os
+import threading
+import time
+from multiprocessing import Pool
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from Rules.bitboard import WHITE
+from Rules.pgn import PgnGame, read_games
+from Rules.position import Position
+from Rules.san import move_to_san, parse_san
+from Rules.search import DRAW, MATE, MATE_BOUND, MAX_PLY, Searcher
+from Rules.tablebase import Tablebases
+
+
+DEFAULT_DEPTH = 4
+
+# Win-percentage lost by a move, and the judgement it earns
+JUDGEMENTS = ((15.0, "blunder"), (10.0, "mistake"), (5.0, "inaccuracy"))
+
+# Per-process state, set up once by _init_worker
+_searcher: Optional[Searcher] = None
+_limits: Tuple[Optional[int], Optional[int]] = (None, None)  # depth, nodes
+
+
+def win_percent(score: int) -> float:
+    """Chance of winning, 0-100, for a centipawn score (Lichess's fitted curve)."""
+    return 50 + 50 * (2 / (1 + math.exp(-0.00368208 * score)) - 1)
+
+
+def move_accuracy(loss: float) -> float:
+    """Accuracy, 0-100, of a move that lost `loss` win-percentage points (Lichess's formula)."""
+    return max(0.0, min(100.0, 103.1668 * math.exp(-0.04354 * loss) - 3.1669))
+
+
+def judge(loss: float) -> Optional[str]:
+    for threshold, name in JUDGEMENTS:
+        if loss >= threshold:
+            return name
+    return None
+
+
+def split_score(score: int) -> Tuple[Optional[int], Optional[int], Optional[str]]:
+    """Centipawns, moves to mate and the mated side for a score from White's point of view.
+
+    Mate counts are positive when White mates. Mate 0 is checkmate on the
+    board, which has no sign, so the mated side ("white" or "black") is named
+    then and only then.
+    """
+    if abs(score) < MATE_BOUND:
+        return score, None, None
+    moves = (MATE - abs(score) + 1) // 2
+    if moves == 0:
+        return None, 0, "black" if score > 0 else "white"
+    return None, moves if score > 0 else -moves, None
+
+
+def _evaluate(searcher: Searcher, position: Position, keys: List[int], depth: Optional[int],
+              nodes: Optional[int]) -> Tuple[int, Optional[int], Dict[int, int]]:
+    """Score for the side to move, the best move (None when the game is over) and each iteration's score."""
+    scores: Dict[int, int] = {}
+    try:
+        result = searcher.search(position, depth if depth is not None else MAX_PLY - 1,
+                                 node_limit=nodes, history=keys,
+                                 on_iteration=lambda iteration: scores.__setitem__(iteration.depth,
+                                                                                  iteration.score))
+    except ValueError:
+        return (-MATE if position.in_check() else DRAW), None, scores
+    return result.score, result.move, scores
+
+
+def analyse_game(searcher: Searcher, game: PgnGame, depth: Optional[int] = None,
+                 nodes: Optional[int] = None) -> Dict[str, Any]:
+    """Evaluation, best move, judgement and accuracy for every move of `game`, as a JSON-ready dict.
+
+    Scores are from White's point of view after each move. A move's loss is
+    the win percentage the mover gave up against the engine's own choice;
+    a side's accuracy is the mean accuracy of its moves. Analysis stops at
+    the first illegal move, which is recorded in "error".
+    """
+    # Start every game from an empty table, so results do not depend on
+    # which games a worker happened to analyse before
+    searcher.tt.clear()
+    if depth is None and nodes is None:
+        depth = DEFAULT_DEPTH
+    moves: List[Dict[str, Any]] = []
+    record: Dict[str, Any] = {"headers": game.headers, "moves": moves,
+                              "accuracy": {"white": None, "black": None}, "error": None}
+    try:
+        position = Position.from_fen(game.fen)
+    except ValueError as exc:
+        record["error"] = str(exc)
+        return record
+
+    keys = [position.key]
+    accuracies: Tuple[List[float], List[float]] = ([], [])
+    score, best, scores = _evaluate(searcher, position, keys, depth, nodes)
+    for ply, san in enumerate(game.moves, 1):
+        legal = position.legal_moves()
+        try:
+            move = parse_san(position, san, legal)
+        except ValueError as exc:
+            record["error"] = f"ply {ply}: {exc}"
+            break
+        mover = position.side
+        best_san = move_to_san(position, best, legal) if best is not None else None
+        position.make_move(move)
+        keys.append(position.key)
+        next_score, next_best, next_scores = _evaluate(searcher, position, keys, depth, nodes)
+
+        # Scores from the mover's side. The played move is judged by the iteration
+        # one ply shallower, which sees as far ahead as the search that chose
+        # `best`; comparing full-depth scores of consecutive positions would
+        # penalise every move at odd depths. The engine's own move loses nothing.
+        after = -next_score
+        if move == best:
+            loss = 0.0
+        else:
+            played = -next_scores.get(max(scores, default=0) - 1, next_score)
+            loss = max(0.0, win_percent(score) - win_percent(played))
+        accuracy = move_accuracy(loss)
+        accuracies[mover].append(accuracy)
+        cp, mate, mated = split_score(after if mover == WHITE else -after)
+        moves.append({"ply": ply, "san": san, "cp": cp, "mate": mate, "mated": mated, "best": best_san,
+                      "loss": round(loss, 1), "judgement": judge(loss), "accuracy": round(accuracy, 1)})
+        score, best, scores = next_score, next_best, next_scores
+
+    for color, name in enumerate(("white", "black")):
+        if accuracies[color]:
+            record["accuracy"][name] = round(sum(accuracies[color]) / len(accuracies[color]), 1)
+    return record
+
+
+def _init_worker(hash_mb: float, depth: Optional[int], nodes: Optional[int],
+                 tablebase_dir: Optional[str]) -> None:
+    global _searcher, _limits
+    tablebases = Tablebases(tablebase_dir) if tablebase_dir else None
+    _searcher = Searcher(hash_mb, tablebases=tablebases)
+    _limits = (depth, nodes)
+
+
+def _analyse_job(job: Tuple[int, PgnGame]) -> Tuple[str, int]:
+    """One output line for the game, and how many moves it analysed."""
+    index, game = job
+    record = analyse_game(_searcher, game, *_limits)
+    return json.dumps({"index": index, **record}), len(record["moves"])
+
+
+def pgn_files(sources: Iterable[str]) -> List[str]:
+    """The PGN files named in `sources`; a directory stands for its *.pgn files, in name order."""
+    paths = []
+    for source in sources:
+        if os.path.isdir(source):
+            paths.extend(sorted(os.path.join(source, name) for name in os.listdir(source)
+                                if name.lower().endswith(".pgn")))
+        else:
+            paths.append(source)
+    return paths
+
+
+def iter_games(paths: Iterable[str]) -> Iterator[PgnGame]:
+    for path in paths:
+        with open(path, encoding="utf-8", errors="replace") as f:
+            yield from read_games(f)
+
+
+def resume_index(path: str) -> int:
+    """Index of the first game missing from the output at `path`.
+
+    Games are written in order, so that is one past the last complete line.
+    A last line cut short by a crash is truncated away.
+    """
+    if not os.path.exists(path):
+        return 0
+    last = None
+    end = 0
+    with open(path, "rb") as f:
+        for line in f:
+            if not line.endswith(b"\n"):
+                break
+            end += len(line)
+            last = line
+    if end != os.path.getsize(path):
+        os.truncate(path, end)
+    return json.loads(last)["index"] + 1 if last else 0
+
+
+def analyse(sources: Iterable[str], output: str, depth: Optional[int] = None,
+            nodes: Optional[int] = None, workers: int = os.cpu_count() or 1, queue: int = 0,
+            start: int = 0, hash_mb: float = 16, tablebase_dir: Optional[str] = None,
+            progress: int = 100) -> Tuple[int, int]:
+    """Analyse every game from index `start` on, appending to `output`; returns (games, moves).
+
+    `queue` caps the games handed out but not yet written (default: two per worker).
+    """
+    # The pool's feeder thread pulls jobs as fast as it can; the semaphore
+    # holds it back until the writer has caught up
+    slots = threading.BoundedSemaphore(queue or 2 * workers)
+
+    def jobs() -> Iterator[Tuple[int, PgnGame]]:
+        for index, game in enumerate(iter_games(pgn_files(sources))):
+            if index >= start:
+                slots.acquire()
+                yield index, game
+
+    games = moves = 0
+    began = time.perf_counter()
+    with Pool(workers, initializer=_init_worker, initargs=(hash_mb, depth, nodes, tablebase_dir)) as pool, \
+            open(output, "a", encoding="utf-8") as out:
+        # imap hands results back in input order
+        for line, count in pool.imap(_analyse_job, jobs()):
+            out.write(line + "\n")
+            out.flush()
+            slots.release()
+            games += 1
+            moves += count
+            if progress and games % progress == 0:
+                elapsed = time.perf_counter() - began
+                print(f"{games} games, {games / elapsed:.2f} games/s, {moves / elapsed:.1f} moves/s",
+                      flush=True)
+    return games, moves
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Analyse every move of a PGN collection with the engine.")
+    parser.add_argument("pgn", nargs="+", help="PGN files or directories of them")
+    parser.add_argument("-o", "--output", default="analysis.jsonl", help="JSONL file, one game per line")
+    budget = parser.add_mutually_exclusive_group()
+    budget.add_argument("--depth", type=int, default=None, help=f"search depth per position (default {DEFAULT_DEPTH})")
+    budget.add_argument("--nodes", type=int, default=None, help="node budget per position")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--queue", type=int, default=0,
+                        help="games in flight at most (default: two per worker)")
+    parser.add_argument("--hash", type=float, default=16, help="transposition table MB per worker")
+    parser.add_argument("--tablebases", default=None, help="directory of endgame tables")
+    resume = parser.add_mutually_exclusive_group()
+    resume.add_argument("--resume", action="store_true",
+                        help="append to the output, starting after the last game in it")
+    resume.add_argument("--start", type=int, default=0, metavar="INDEX",
+                        help="first game to analyse, counting from 0 across all inputs; "
+                             "above 0 the output is appended to")
+    parser.add_argument("--progress", type=int, default=100, metavar="GAMES",
+                        help="report the rate every GAMES games (0: only at the end)")
+    args = parser.parse_args(argv)
+
+    if args.resume:
+        start = resume_index(args.output)
+    else:
+        start = args.start
+        # A run from a later game adds to the output rather than replacing it
+        if start == 0 and os.path.exists(args.output):
+            os.remove(args.output)
+    if start:
+        print(f"Starting at game {start}")
+
+    began = time.perf_counter()
+    games, moves = analyse(args.pgn, args.output, args.depth, args.nodes, max(1, args.workers),
+                           args.queue, start, args.hash, args.tablebases, args.progress)
+    elapsed = time.perf_counter() - began
+    print(f"{games} games, {moves} moves analysed in {elapsed:.1f}s "
+          f"({games / elapsed if elapsed else 0:.2f} games/s), written to {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
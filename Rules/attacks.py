@@ -0,0 +1,133 @@
+"""Incremental attack maps: which pieces attack every square, for both colours."""
+
+from typing import TYPE_CHECKING, List
+
+from Rules.bitboard import (
+    WHITE, BLACK, PAWN, KNIGHT, BISHOP, ROOK, QUEEN,
+    KNIGHT_ATTACKS, KING_ATTACKS, PAWN_ATTACKS,
+    rook_attacks, bishop_attacks, queen_attacks,
+)
+
+if TYPE_CHECKING:
+    from Rules.position import Position
+
+
+def piece_attacks(code: int, sq: int, occupied: int) -> int:
+    """Squares attacked by the piece `code` (color * 6 + type) standing on `sq`."""
+    color, ptype = divmod(code, 6)
+    if ptype == PAWN:
+        return PAWN_ATTACKS[color][sq]
+    if ptype == KNIGHT:
+        return KNIGHT_ATTACKS[sq]
+    if ptype == BISHOP:
+        return bishop_attacks(sq, occupied)
+    if ptype == ROOK:
+        return rook_attacks(sq, occupied)
+    if ptype == QUEEN:
+        return queen_attacks(sq, occupied)
+    return KING_ATTACKS[sq]
+
+
+class AttackMap:
+    def __init__(self, position: "Position") -> None:
+        # attackers[color][sq]: bitboard of `color` pieces attacking sq
+        self.attackers: List[List[int]] = [[0] * 64, [0] * 64]
+        # attacked[color]: every square `color` attacks at least once
+        self.attacked: List[int] = [0, 0]
+        # squares attacked by the piece on each square, so it can be withdrawn later
+        self.from_square: List[int] = [0] * 64
+
+        occupied = position.occupied
+        for sq, code in enumerate(position.mailbox):
+            if code is not None:
+                self._add(sq, code // 6, piece_attacks(code, sq, occupied))
+
+    def copy(self) -> "AttackMap":
+        attack_map = AttackMap.__new__(AttackMap)
+        attack_map.attackers = [self.attackers[WHITE][:], self.attackers[BLACK][:]]
+        attack_map.attacked = self.attacked[:]
+        attack_map.from_square = self.from_square[:]
+        return attack_map
+
+    # ==== Lookups ====
+
+    def attackers_to(self, sq: int, color: int) -> int:
+        return self.attackers[color][sq]
+
+    def count(self, sq: int, color: int) -> int:
+        """Number of `color` pieces attacking `sq`."""
+        return self.attackers[color][sq].bit_count()
+
+    def is_attacked(self, sq: int, color: int) -> bool:
+        return bool(self.attacked[color] >> sq & 1)
+
+    # ==== Incremental update ====
+
+    def _add(self, sq: int, color: int, targets: int) -> None:
+        self.from_square[sq] = targets
+        bit = 1 << sq
+        attackers = self.attackers[color]
+        self.attacked[color] |= targets
+        while targets:
+            low = targets & -targets
+            targets ^= low
+            attackers[low.bit_length() - 1] |= bit
+
+    def _withdraw(self, sq: int, color: int) -> None:
+        targets = self.from_square[sq]
+        self.from_square[sq] = 0
+        bit = ~(1 << sq)
+        attackers = self.attackers[color]
+        emptied = 0
+        while targets:
+            low = targets & -targets
+            targets ^= low
+            t = low.bit_length() - 1
+            attackers[t] &= bit
+            if not attackers[t]:
+                emptied |= low
+        self.attacked[color] &= ~emptied
+
+    def begin_move(self, position: "Position", touched: int) -> int:
+        """Withdraw the pieces on `touched` squares before a move changes them.
+
+        Returns the sliders whose rays pass a touched square; their attacks
+        must be recomputed in end_move() once the move has been made.
+        """
+        sliders = 0
+        for color in (WHITE, BLACK):
+            bbs = position.bitboards[color]
+            color_sliders = bbs[BISHOP] | bbs[ROOK] | bbs[QUEEN]
+            attackers = self.attackers[color]
+            squares = touched
+            while squares:
+                low = squares & -squares
+                squares ^= low
+                sliders |= attackers[low.bit_length() - 1] & color_sliders
+        sliders &= ~touched
+
+        mailbox = position.mailbox
+        squares = touched
+        while squares:
+            low = squares & -squares
+            squares ^= low
+            sq = low.bit_length() - 1
+            if mailbox[sq] is not None:
+                self._withdraw(sq, mailbox[sq] // 6)
+        return sliders
+
+    def end_move(self, position: "Position", touched: int, sliders: int) -> None:
+        """Add back the new occupants of `touched` and re-trace the stale sliders."""
+        mailbox = position.mailbox
+        occupied = position.occupied
+        squares = touched | sliders
+        while squares:
+            low = squares & -squares
+            squares ^= low
+            sq = low.bit_length() - 1
+            code = mailbox[sq]
+            if code is None:
+                continue
+            if low & sliders:
+                self._withdraw(sq, code // 6)
+            self._add(sq, code // 6, piece_attacks(code, sq, occupied))
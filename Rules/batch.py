@@ -0,0 +1,274 @@
+"""Batch evaluation: score many static positions at once with NumPy.
+
+Positions are packed as an (N, 12) uint64 array, one bitboard per piece
+code (color * 6 + type), or given as (N, 12, 64) planes with square a1 = 0;
+no two pieces may share a square. Every term of Rules.evaluate is computed
+for the whole array at once: material and piece-square tables as popcounts
+of bit planes, pawn structure with the same set-wise helpers evaluate()
+uses, and mobility with Kogge-Stone fills, which give the same union of
+attacked squares as evaluate()'s per-piece attacks. The scores are exactly
+evaluate()'s, roughly 20-40x faster than calling it per position; the
+ratio depends on the machine, and --check measures it. Popcounts use
+np.bitwise_count from NumPy 2.0 on; older NumPy falls back to a byte
+lookup table, which gives the same scores at a fraction of the speed.
+
+Usage:
+    python -m Rules.batch positions.fen             # positions/sec, one FEN per line
+    python -m Rules.batch positions.fen --check 1000 # speedup over evaluate() and agreement
+"""
+
+import argparse
+import time
+from typing import Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from Rules.bitboard import (
+    WHITE, BLACK, PAWN, KNIGHT, BISHOP, ROOK, QUEEN,
+    RANK_1, NOT_FILE_A, NOT_FILE_H, NOT_FILE_AB, NOT_FILE_GH,
+)
+from Rules.evaluate import (
+    PIECE_SQUARE, DOUBLED_PAWN, ISOLATED_PAWN, PASSED_PAWN,
+    KNIGHT_MOBILITY, DIAGONAL_MOBILITY, ORTHOGONAL_MOBILITY,
+    evaluate, south_fill, isolated_pawns, passed_pawns,
+)
+from Rules.position import Position
+
+
+# Rows per pass, small enough for the temporaries to stay in cache
+CHUNK = 1 << 13
+
+# (shift, squares a step may land on); negative shifts go toward a1
+DIAGONAL_STEPS = ((9, NOT_FILE_A), (7, NOT_FILE_H), (-7, NOT_FILE_A), (-9, NOT_FILE_H))
+ORTHOGONAL_STEPS = ((8, None), (-8, None), (1, NOT_FILE_A), (-1, NOT_FILE_H))
+
+
+# Per colour and bit: (piece type, squares) for each type with squares in that bit plane
+Planes = List[List[List[Tuple[int, np.uint64]]]]
+
+
+def _square_planes() -> Tuple[Planes, np.ndarray]:
+    # A code's material-and-placement score for bitboard bb is
+    # low * popcount(bb) + sum over j of 2**j * popcount(bb & plane j), where
+    # low is the minimum of its table and plane j holds the squares where bit j
+    # of (value - low) is set. A side's pieces never share a square, so plane j
+    # of all its piece types is or-ed together and counted once. Weights run
+    # white's six lows, white's planes, then the same for black.
+    depth = max((max(table) - min(table)).bit_length() for table in PIECE_SQUARE)
+    planes: Planes = []
+    weights = []
+    for color, sign in ((WHITE, 1), (BLACK, -1)):
+        tables = PIECE_SQUARE[color * 6:color * 6 + 6]
+        lows = [min(table) for table in tables]
+        by_bit = []
+        for bit in range(depth):
+            masks = []
+            for ptype, (table, low) in enumerate(zip(tables, lows)):
+                mask = sum(1 << sq for sq, value in enumerate(table) if (value - low) >> bit & 1)
+                if mask:
+                    masks.append((ptype, np.uint64(mask)))
+            by_bit.append(masks)
+        planes.append(by_bit)
+        weights += [sign * low for low in lows] + [sign << bit for bit in range(depth)]
+    return planes, np.array(weights, dtype=np.float32)
+
+
+SQUARE_PLANES, PLANE_WEIGHTS = _square_planes()
+
+# Passed pawn bonus by absolute rank, for each colour
+PASSED_BY_RANK = np.array([PASSED_PAWN, PASSED_PAWN[::-1]], dtype=np.float32)
+
+
+# ==== Packing ====
+
+def pack_positions(positions: Iterable[Position]) -> Tuple[np.ndarray, np.ndarray]:
+    """(N, 12) uint64 bitboards and (N,) sides to move for `positions`."""
+    boards = []
+    sides = []
+    for position in positions:
+        boards.append(position.bitboards[WHITE] + position.bitboards[BLACK])
+        sides.append(position.side)
+    return (np.array(boards, dtype=np.uint64).reshape(-1, 12),
+            np.array(sides, dtype=np.uint8))
+
+
+def planes_to_boards(planes: np.ndarray) -> np.ndarray:
+    """(N, 12, 64) piece planes (any dtype, nonzero = occupied) to (N, 12) uint64 bitboards."""
+    planes = np.asarray(planes)
+    if planes.ndim != 3 or planes.shape[1:] != (12, 64):
+        raise ValueError(f"Expected (N, 12, 64) planes, got {planes.shape}")
+    packed = np.packbits(planes != 0, axis=-1, bitorder="little")
+    return np.ascontiguousarray(packed).view("<u8").reshape(-1, 12)
+
+
+def boards_to_planes(boards: np.ndarray) -> np.ndarray:
+    """(N, 12) bitboards to (N, 12, 64) uint8 planes of 0 and 1."""
+    boards = np.ascontiguousarray(boards, dtype="<u8")
+    return np.unpackbits(boards.view(np.uint8).reshape(-1, 12, 8), axis=-1, bitorder="little")
+
+
+def as_boards(data: np.ndarray) -> np.ndarray:
+    """(N, 12) uint64 bitboards from bitboards or planes."""
+    data = np.asarray(data)
+    if data.ndim == 3:
+        return planes_to_boards(data)
+    if data.ndim != 2 or data.shape[1] != 12:
+        raise ValueError(f"Expected (N, 12) bitboards or (N, 12, 64) planes, got {data.shape}")
+    return np.ascontiguousarray(data, dtype="<u8")
+
+
+# ==== Set-wise attacks ====
+
+def knight_coverage(knights: np.ndarray) -> np.ndarray:
+    """Every square a knight in `knights` attacks."""
+    one = ((knights << 1) & NOT_FILE_A) | ((knights >> 1) & NOT_FILE_H)
+    two = ((knights << 2) & NOT_FILE_AB) | ((knights >> 2) & NOT_FILE_GH)
+    return (one << 16) | (one >> 16) | (two << 8) | (two >> 8)
+
+
+def coverage(sliders: np.ndarray, empty: np.ndarray, steps) -> np.ndarray:
+    """Every square a slider in `sliders` attacks along `steps`.
+
+    Kogge-Stone fills: sliders spread over the empty squares in doubling
+    strides, and a last step adds the first blocker of each ray. `sliders`
+    may stack several sets of sliders, e.g. both colours', over one `empty`.
+    """
+    covered = np.zeros_like(sliders)
+    fill = np.empty_like(sliders)
+    spread = np.empty_like(sliders)
+    for shift, mask in steps:
+        step = np.left_shift if shift > 0 else np.right_shift
+        shift = abs(shift)
+        free = empty if mask is None else empty & mask
+        fill[...] = sliders
+        for stride in (shift, 2 * shift, 4 * shift):
+            step(fill, stride, out=spread)
+            spread &= free
+            fill |= spread
+            if stride != 4 * shift:
+                free = free & step(free, stride)
+        step(fill, shift, out=spread)
+        if mask is not None:
+            spread &= mask
+        covered |= spread
+    return covered
+
+
+# ==== Terms ====
+# Positions run along the last axis, so every operation works on long rows
+
+if hasattr(np, "bitwise_count"):
+    _popcount = np.bitwise_count
+else:
+    # NumPy before 2.0: look up each byte's count and add them up
+    _BYTE_COUNTS = np.array([bin(byte).count("1") for byte in range(256)], dtype=np.uint8)
+
+    def _popcount(bb: np.ndarray, out: Optional[np.ndarray] = None) -> np.ndarray:
+        bb = np.ascontiguousarray(bb)
+        counts = _BYTE_COUNTS[bb.view(np.uint8).reshape(bb.shape + (bb.dtype.itemsize,))]
+        return counts.sum(axis=-1, dtype=np.uint8, out=out)
+
+
+def _count(bb: np.ndarray) -> np.ndarray:
+    return _popcount(bb).astype(np.int32)
+
+
+def material(pieces: np.ndarray) -> np.ndarray:
+    """Material and piece-square score of (2, 6, N) bitboards, white minus black."""
+    count = pieces.shape[2]
+    counts = np.empty((2, 6 + len(SQUARE_PLANES[WHITE]), count), dtype=np.uint8)
+    _popcount(pieces, out=counts[:, :6])
+    plane = np.empty(count, dtype=np.uint64)
+    part = np.empty(count, dtype=np.uint64)
+    for color, planes in enumerate(SQUARE_PLANES):
+        for bit, ((first, mask), *rest) in enumerate(planes):
+            np.bitwise_and(pieces[color, first], mask, out=plane)
+            for ptype, mask in rest:
+                np.bitwise_and(pieces[color, ptype], mask, out=part)
+                plane |= part
+            _popcount(plane, out=counts[color, 6 + bit])
+    # Sums of small integers, exact in float32
+    return (PLANE_WEIGHTS @ counts.reshape(len(PLANE_WEIGHTS), -1).astype(np.float32)).astype(np.int32)
+
+
+def pawn_structure(white_pawns: np.ndarray, black_pawns: np.ndarray) -> np.ndarray:
+    """Doubled, isolated and passed pawns, white minus black."""
+    score = np.zeros(len(white_pawns), dtype=np.int32)
+    for color, sign, pawns, theirs in ((WHITE, 1, white_pawns, black_pawns),
+                                       (BLACK, -1, black_pawns, white_pawns)):
+        doubled = _count(pawns) - _count(south_fill(pawns) & RANK_1)
+        term = DOUBLED_PAWN * doubled + ISOLATED_PAWN * _count(isolated_pawns(pawns))
+        # One byte of the bitboard per rank
+        passed = _popcount(passed_pawns(pawns, theirs, color).view(np.uint8)).reshape(-1, 8)
+        term += (passed.astype(np.float32) @ PASSED_BY_RANK[color]).astype(np.int32)
+        score += sign * term
+    return score
+
+
+def mobility(pieces: np.ndarray, own: np.ndarray, empty: np.ndarray) -> np.ndarray:
+    """(2, N) mobility of white and black from (2, 6, N) bitboards; `own` is each side's (2, N) occupancy."""
+    queens = pieces[:, QUEEN]
+    free = ~own
+    knights = knight_coverage(pieces[:, KNIGHT])
+    diagonal = coverage(pieces[:, BISHOP] | queens, empty, DIAGONAL_STEPS)
+    orthogonal = coverage(pieces[:, ROOK] | queens, empty, ORTHOGONAL_STEPS)
+    return (KNIGHT_MOBILITY * _count(knights & free)
+            + DIAGONAL_MOBILITY * _count(diagonal & free)
+            + ORTHOGONAL_MOBILITY * _count(orthogonal & free))
+
+
+def _evaluate_chunk(boards: np.ndarray) -> np.ndarray:
+    pieces = np.ascontiguousarray(boards.T).reshape(2, 6, -1)
+    own = np.bitwise_or.reduce(pieces, axis=1)
+    white_mobility, black_mobility = mobility(pieces, own, ~(own[WHITE] | own[BLACK]))
+    return (material(pieces)
+            + pawn_structure(pieces[WHITE, PAWN], pieces[BLACK, PAWN])
+            + white_mobility - black_mobility)
+
+
+def evaluate_batch(data: np.ndarray, sides: Optional[np.ndarray] = None) -> np.ndarray:
+    """(N,) int32 scores of (N, 12) bitboards or (N, 12, 64) planes, as evaluate() gives them.
+
+    Scores are from white's point of view, or from the side to move's when
+    `sides` (WHITE or BLACK per position) is given.
+    """
+    boards = as_boards(data)
+    scores = np.empty(len(boards), dtype=np.int32)
+    for start in range(0, len(boards), CHUNK):
+        scores[start:start + CHUNK] = _evaluate_chunk(boards[start:start + CHUNK])
+    if sides is not None:
+        scores = np.where(np.asarray(sides) == WHITE, scores, -scores)
+    return scores
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Evaluate a file of FENs in one batch.")
+    parser.add_argument("fens", help="file with one FEN per line")
+    parser.add_argument("--check", type=int, default=0, metavar="N",
+                        help="also score the first N positions with evaluate() and compare")
+    args = parser.parse_args(argv)
+
+    with open(args.fens, encoding="utf-8") as f:
+        positions = [Position.from_fen(line) for line in f if line.strip()]
+    boards, sides = pack_positions(positions)
+    start = time.perf_counter()
+    scores = evaluate_batch(boards, sides)
+    elapsed = time.perf_counter() - start
+    print(f"{len(scores)} positions in {elapsed:.3f}s ({len(scores) / elapsed if elapsed else 0:,.0f} positions/s)")
+
+    if args.check:
+        sample = positions[:args.check]
+        start = time.perf_counter()
+        expected = [evaluate(position) for position in sample]
+        scalar = time.perf_counter() - start
+        mismatches = int(np.count_nonzero(scores[:len(sample)] != expected))
+        speedup = scalar / len(sample) / (elapsed / len(scores)) if elapsed else 0
+        print(f"evaluate(): {len(sample) / scalar:,.0f} positions/s, batch {speedup:.0f}x faster, "
+              f"{mismatches} mismatches")
+        if mismatches:
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
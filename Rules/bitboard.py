@@ -0,0 +1,167 @@
+"""Bitboard primitives for the headless rules core (no pygame imports here)."""
+
+from typing import Iterator, Tuple
+
+
+# Colours and piece types, used as indexes into the bitboard tables
+WHITE, BLACK = 0, 1
+PAWN, KNIGHT, BISHOP, ROOK, QUEEN, KING = range(6)
+
+COLOR_NAMES = ("white", "black")
+PIECE_NAMES = ("pawn", "knight", "bishop", "rook", "queen", "king")
+PIECE_SYMBOLS = "pnbrqk"
+
+# Squares are numbered a1 = 0 ... h8 = 63 (little-endian rank-file mapping)
+FULL = (1 << 64) - 1
+FILE_A = 0x0101010101010101
+FILE_H = FILE_A << 7
+NOT_FILE_A = FULL ^ FILE_A
+NOT_FILE_H = FULL ^ FILE_H
+NOT_FILE_AB = NOT_FILE_A & (NOT_FILE_A << 1)
+NOT_FILE_GH = NOT_FILE_H & (NOT_FILE_H >> 1)
+RANK_1 = 0xFF
+RANK_3 = RANK_1 << 16
+RANK_6 = RANK_1 << 40
+RANK_8 = RANK_1 << 56
+
+FILE_NAMES = "abcdefgh"
+
+
+def square(rank: int, file: int) -> int:
+    return rank * 8 + file
+
+
+def square_name(sq: int) -> str:
+    return f"{FILE_NAMES[sq & 7]}{(sq >> 3) + 1}"
+
+
+def parse_square(name: str) -> int:
+    if len(name) != 2 or name[0] not in FILE_NAMES or name[1] not in "12345678":
+        raise ValueError(f"Invalid square: {name!r}")
+    return square(int(name[1]) - 1, FILE_NAMES.index(name[0]))
+
+
+def to_coords(sq: int) -> Tuple[int, int]:
+    """Convert a square index to the (rank, file) grid coords used by the UI."""
+    return 7 - (sq >> 3), sq & 7
+
+
+def from_coords(coords: Tuple[int, int]) -> int:
+    """Convert UI (rank, file) grid coords, rank 0 at the top, to a square."""
+    rank, file = coords
+    return (7 - rank) * 8 + file
+
+
+def iter_bits(bb: int) -> Iterator[int]:
+    """Yield the index of every set bit, lowest first."""
+    while bb:
+        low = bb & -bb
+        yield low.bit_length() - 1
+        bb ^= low
+
+
+def lsb(bb: int) -> int:
+    return (bb & -bb).bit_length() - 1
+
+
+def popcount(bb: int) -> int:
+    return bb.bit_count()
+
+
+# ==== Attack tables, built once at import ====
+
+# Directions as (rank step, file step); the first four walk towards higher squares
+NORTH, NORTH_EAST, EAST, NORTH_WEST, SOUTH, SOUTH_WEST, WEST, SOUTH_EAST = range(8)
+DIRECTION_STEPS = ((1, 0), (1, 1), (0, 1), (1, -1),
+                   (-1, 0), (-1, -1), (0, -1), (-1, 1))
+ROOK_DIRECTIONS = (NORTH, EAST, SOUTH, WEST)
+BISHOP_DIRECTIONS = (NORTH_EAST, NORTH_WEST, SOUTH_WEST, SOUTH_EAST)
+
+
+def _offsets_table(offsets) -> list:
+    table = []
+    for sq in range(64):
+        rank, file = sq >> 3, sq & 7
+        bb = 0
+        for dr, df in offsets:
+            r, f = rank + dr, file + df
+            if 0 <= r < 8 and 0 <= f < 8:
+                bb |= 1 << (r * 8 + f)
+        table.append(bb)
+    return table
+
+
+def _ray_table() -> list:
+    rays = []
+    for dr, df in DIRECTION_STEPS:
+        direction_rays = []
+        for sq in range(64):
+            r, f = (sq >> 3) + dr, (sq & 7) + df
+            bb = 0
+            while 0 <= r < 8 and 0 <= f < 8:
+                bb |= 1 << (r * 8 + f)
+                r, f = r + dr, f + df
+            direction_rays.append(bb)
+        rays.append(direction_rays)
+    return rays
+
+
+KNIGHT_ATTACKS = _offsets_table(((2, 1), (2, -1), (-2, 1), (-2, -1),
+                                 (1, 2), (1, -2), (-1, 2), (-1, -2)))
+KING_ATTACKS = _offsets_table(DIRECTION_STEPS)
+# PAWN_ATTACKS[color][sq]: squares a `color` pawn on sq attacks
+PAWN_ATTACKS = [_offsets_table(((1, -1), (1, 1))), _offsets_table(((-1, -1), (-1, 1)))]
+# RAYS[direction][sq]: every square from sq to the board edge, sq excluded
+RAYS = _ray_table()
+_N, _NE, _E, _NW, _S, _SW, _W, _SE = RAYS
+
+# BETWEEN[a][b]: squares strictly between two aligned squares, else 0
+# LINE[a][b]: the full edge-to-edge line through two aligned squares, else 0
+BETWEEN = [[0] * 64 for _ in range(64)]
+LINE = [[0] * 64 for _ in range(64)]
+for _sq in range(64):
+    for _dir in range(8):
+        _ray = RAYS[_dir][_sq]
+        _back = RAYS[(_dir + 4) % 8][_sq]
+        for _target in iter_bits(_ray):
+            BETWEEN[_sq][_target] = _ray & ~RAYS[_dir][_target] & ~(1 << _target)
+            LINE[_sq][_target] = _ray | _back | (1 << _sq)
+del _sq, _dir, _ray, _back, _target
+
+
+def rook_attacks(sq: int, occupied: int) -> int:
+    """Rook attacks from sq: each ray is cut at its first blocker (blocker included)."""
+    ray = _N[sq]
+    blockers = ray & occupied
+    attacks = ray ^ _N[(blockers & -blockers).bit_length() - 1] if blockers else ray
+    ray = _E[sq]
+    blockers = ray & occupied
+    attacks |= ray ^ _E[(blockers & -blockers).bit_length() - 1] if blockers else ray
+    ray = _S[sq]
+    blockers = ray & occupied
+    attacks |= ray ^ _S[blockers.bit_length() - 1] if blockers else ray
+    ray = _W[sq]
+    blockers = ray & occupied
+    attacks |= ray ^ _W[blockers.bit_length() - 1] if blockers else ray
+    return attacks
+
+
+def bishop_attacks(sq: int, occupied: int) -> int:
+    """Bishop attacks from sq, same scheme as rook_attacks."""
+    ray = _NE[sq]
+    blockers = ray & occupied
+    attacks = ray ^ _NE[(blockers & -blockers).bit_length() - 1] if blockers else ray
+    ray = _NW[sq]
+    blockers = ray & occupied
+    attacks |= ray ^ _NW[(blockers & -blockers).bit_length() - 1] if blockers else ray
+    ray = _SW[sq]
+    blockers = ray & occupied
+    attacks |= ray ^ _SW[blockers.bit_length() - 1] if blockers else ray
+    ray = _SE[sq]
+    blockers = ray & occupied
+    attacks |= ray ^ _SE[blockers.bit_length() - 1] if blockers else ray
+    return attacks
+
+
+def queen_attacks(sq: int, occupied: int) -> int:
+    return rook_attacks(sq, occupied) | bishop_attacks(sq, occupied)
@@ -0,0 +1,243 @@
+"""Static evaluation in centipawns: material, piece-square tables, pawn structure and mobility.
+
+The pawn-structure helpers work on whole bitboards with &, |, ^ and
+shifts only, so they run unchanged on NumPy uint64 arrays; Rules.batch
+uses them to score many positions at once and must give exactly what
+evaluate() gives.
+"""
+
+from typing import TYPE_CHECKING, Dict, List, Tuple
+
+from Rules.bitboard import (
+    WHITE, BLACK, PAWN, KNIGHT, BISHOP, ROOK, QUEEN, KING,
+    FULL, FILE_A, FILE_H, RANK_1, RANK_8, NOT_FILE_A, NOT_FILE_H,
+    NORTH, NORTH_EAST, EAST, NORTH_WEST, SOUTH, SOUTH_WEST, WEST, SOUTH_EAST, RAYS,
+    KNIGHT_ATTACKS, rook_attacks, bishop_attacks,
+)
+
+if TYPE_CHECKING:
+    from Rules.position import Position
+
+
+PIECE_VALUES = (100, 320, 330, 500, 900, 0)
+
+# Piece-square bonuses from white's point of view, written as the board is
+# seen from white's side: the first row is rank 8, the last is rank 1
+_PAWN_TABLE = (
+    0, 0, 0, 0, 0, 0, 0, 0,
+    50, 50, 50, 50, 50, 50, 50, 50,
+    10, 10, 20, 30, 30, 20, 10, 10,
+    5, 5, 10, 25, 25, 10, 5, 5,
+    0, 0, 0, 20, 20, 0, 0, 0,
+    5, -5, -10, 0, 0, -10, -5, 5,
+    5, 10, 10, -20, -20, 10, 10, 5,
+    0, 0, 0, 0, 0, 0, 0, 0,
+)
+_KNIGHT_TABLE = (
+    -50, -40, -30, -30, -30, -30, -40, -50,
+    -40, -20, 0, 0, 0, 0, -20, -40,
+    -30, 0, 10, 15, 15, 10, 0, -30,
+    -30, 5, 15, 20, 20, 15, 5, -30,
+    -30, 0, 15, 20, 20, 15, 0, -30,
+    -30, 5, 10, 15, 15, 10, 5, -30,
+    -40, -20, 0, 5, 5, 0, -20, -40,
+    -50, -40, -30, -30, -30, -30, -40, -50,
+)
+_BISHOP_TABLE = (
+    -20, -10, -10, -10, -10, -10, -10, -20,
+    -10, 0, 0, 0, 0, 0, 0, -10,
+    -10, 0, 5, 10, 10, 5, 0, -10,
+    -10, 5, 5, 10, 10, 5, 5, -10,
+    -10, 0, 10, 10, 10, 10, 0, -10,
+    -10, 10, 10, 10, 10, 10, 10, -10,
+    -10, 5, 0, 0, 0, 0, 5, -10,
+    -20, -10, -10, -10, -10, -10, -10, -20,
+)
+_ROOK_TABLE = (
+    0, 0, 0, 0, 0, 0, 0, 0,
+    5, 10, 10, 10, 10, 10, 10, 5,
+    -5, 0, 0, 0, 0, 0, 0, -5,
+    -5, 0, 0, 0, 0, 0, 0, -5,
+    -5, 0, 0, 0, 0, 0, 0, -5,
+    -5, 0, 0, 0, 0, 0, 0, -5,
+    -5, 0, 0, 0, 0, 0, 0, -5,
+    0, 0, 0, 5, 5, 0, 0, 0,
+)
+_QUEEN_TABLE = (
+    -20, -10, -10, -5, -5, -10, -10, -20,
+    -10, 0, 0, 0, 0, 0, 0, -10,
+    -10, 0, 5, 5, 5, 5, 0, -10,
+    -5, 0, 5, 5, 5, 5, 0, -5,
+    0, 0, 5, 5, 5, 5, 0, -5,
+    -10, 5, 5, 5, 5, 5, 0, -10,
+    -10, 0, 5, 0, 0, 0, 0, -10,
+    -20, -10, -10, -5, -5, -10, -10, -20,
+)
+_KING_TABLE = (
+    -30, -40, -40, -50, -50, -40, -40, -30,
+    -30, -40, -40, -50, -50, -40, -40, -30,
+    -30, -40, -40, -50, -50, -40, -40, -30,
+    -30, -40, -40, -50, -50, -40, -40, -30,
+    -20, -30, -30, -40, -40, -30, -30, -20,
+    -10, -20, -20, -20, -20, -20, -20, -10,
+    20, 20, 0, 0, 0, 0, 20, 20,
+    20, 30, 10, 0, 0, 10, 30, 20,
+)
+
+
+def _build_tables() -> List[List[int]]:
+    # PIECE_SQUARE[code][sq]: material plus placement for piece code
+    # (color * 6 + type) on square sq, positive for both colours
+    tables = []
+    for color in (WHITE, BLACK):
+        for ptype, table in enumerate((_PAWN_TABLE, _KNIGHT_TABLE, _BISHOP_TABLE,
+                                       _ROOK_TABLE, _QUEEN_TABLE, _KING_TABLE)):
+            # Row 0 of the written table is rank 8, so white reads it mirrored
+            tables.append([PIECE_VALUES[ptype] + table[sq ^ 56 if color == WHITE else sq]
+                           for sq in range(64)])
+    return tables
+
+
+PIECE_SQUARE = _build_tables()
+
+DOUBLED_PAWN = -10  # per pawn beyond the first on its file
+ISOLATED_PAWN = -15  # per pawn with no friendly pawn on a neighbouring file
+# Passed pawn bonus by rank, counted from the pawn's own side
+PASSED_PAWN = (0, 5, 10, 20, 35, 60, 100, 0)
+# Per square attacked and not held by a friendly piece. A square counts once
+# per group however many of the group's pieces attack it: an approximation,
+# but one that can be computed set-wise (see Rules.batch)
+KNIGHT_MOBILITY = 4
+DIAGONAL_MOBILITY = 3  # bishops and queens
+ORTHOGONAL_MOBILITY = 2  # rooks and queens
+
+# Pawn structure of (white pawns, black pawns), white minus black
+_pawn_cache: Dict[Tuple[int, int], int] = {}
+PAWN_CACHE_SIZE = 1 << 16
+
+# Squares whose occupants can block a rook or bishop on each square (board
+# edges never block anything), and the attacks for each such occupancy,
+# filled in as they come up: at most ~100k rook and ~5k bishop entries
+_EDGES = FILE_A | FILE_H | RANK_1 | RANK_8
+ROOK_BLOCKERS = [(RAYS[NORTH][sq] & ~RANK_8) | (RAYS[SOUTH][sq] & ~RANK_1)
+                 | (RAYS[EAST][sq] & ~FILE_H) | (RAYS[WEST][sq] & ~FILE_A) for sq in range(64)]
+BISHOP_BLOCKERS = [(RAYS[NORTH_EAST][sq] | RAYS[NORTH_WEST][sq] | RAYS[SOUTH_WEST][sq]
+                    | RAYS[SOUTH_EAST][sq]) & ~_EDGES for sq in range(64)]
+_rook_memo: List[Dict[int, int]] = [{} for _ in range(64)]
+_bishop_memo: List[Dict[int, int]] = [{} for _ in range(64)]
+
+
+# ==== Set-wise helpers (Python ints or NumPy uint64 arrays) ====
+
+def north_fill(bb):
+    bb = bb | ((bb << 8) & FULL)
+    bb = bb | ((bb << 16) & FULL)
+    return bb | ((bb << 32) & FULL)
+
+
+def south_fill(bb):
+    bb = bb | (bb >> 8)
+    bb = bb | (bb >> 16)
+    return bb | (bb >> 32)
+
+
+def file_fill(bb):
+    """Every square on a file holding one of `bb`'s squares."""
+    return north_fill(south_fill(bb) & RANK_1)
+
+
+def neighbour_files(files):
+    """The files either side of a file fill."""
+    return ((files << 1) & NOT_FILE_A) | ((files >> 1) & NOT_FILE_H)
+
+
+def isolated_pawns(pawns):
+    return pawns & (FULL ^ neighbour_files(file_fill(pawns)))
+
+
+def passed_pawns(pawns, their_pawns, color: int):
+    """`pawns` with no enemy pawn ahead of them on their own or a neighbouring file."""
+    if color == WHITE:
+        ahead = south_fill(their_pawns >> 8)
+    else:
+        ahead = north_fill((their_pawns << 8) & FULL)
+    return pawns & (FULL ^ (ahead | neighbour_files(ahead)))
+
+
+# ==== Terms ====
+
+def pawn_structure(white_pawns: int, black_pawns: int) -> int:
+    """Doubled, isolated and passed pawns, white minus black."""
+    key = (white_pawns, black_pawns)
+    score = _pawn_cache.get(key)
+    if score is not None:
+        return score
+    score = 0
+    for color, sign, pawns, theirs in ((WHITE, 1, white_pawns, black_pawns),
+                                       (BLACK, -1, black_pawns, white_pawns)):
+        doubled = pawns.bit_count() - (south_fill(pawns) & RANK_1).bit_count()
+        term = DOUBLED_PAWN * doubled + ISOLATED_PAWN * isolated_pawns(pawns).bit_count()
+        passed = passed_pawns(pawns, theirs, color)
+        while passed:
+            low = passed & -passed
+            passed ^= low
+            rank = (low.bit_length() - 1) >> 3
+            term += PASSED_PAWN[rank if color == WHITE else 7 - rank]
+        score += sign * term
+    if len(_pawn_cache) >= PAWN_CACHE_SIZE:
+        _pawn_cache.clear()
+    _pawn_cache[key] = score
+    return score
+
+
+def _slider_coverage(sliders: int, occupied: int, blockers: List[int],
+                     memo: List[Dict[int, int]], attacks_of) -> int:
+    covered = 0
+    while sliders:
+        low = sliders & -sliders
+        sliders ^= low
+        sq = low.bit_length() - 1
+        key = occupied & blockers[sq]
+        attacks = memo[sq].get(key)
+        if attacks is None:
+            attacks = memo[sq][key] = attacks_of(sq, occupied)
+        covered |= attacks
+    return covered
+
+
+def mobility(bbs: List[int], own: int, occupied: int) -> int:
+    """Mobility of the side with bitboards `bbs` and occupancy `own`."""
+    free = FULL ^ own
+    knights = 0
+    bb = bbs[KNIGHT]
+    while bb:
+        low = bb & -bb
+        bb ^= low
+        knights |= KNIGHT_ATTACKS[low.bit_length() - 1]
+    diagonal = _slider_coverage(bbs[BISHOP] | bbs[QUEEN], occupied, BISHOP_BLOCKERS,
+                                _bishop_memo, bishop_attacks)
+    orthogonal = _slider_coverage(bbs[ROOK] | bbs[QUEEN], occupied, ROOK_BLOCKERS,
+                                  _rook_memo, rook_attacks)
+    return (KNIGHT_MOBILITY * (knights & free).bit_count()
+            + DIAGONAL_MOBILITY * (diagonal & free).bit_count()
+            + ORTHOGONAL_MOBILITY * (orthogonal & free).bit_count())
+
+
+def evaluate(position: "Position") -> int:
+    """Score `position` in centipawns from the side to move's point of view."""
+    white, black = position.bitboards
+    white_occ, black_occ = position.occupancy
+    occupied = white_occ | black_occ
+    score = (pawn_structure(white[PAWN], black[PAWN])
+             + mobility(white, white_occ, occupied) - mobility(black, black_occ, occupied))
+    for color, sign in ((WHITE, 1), (BLACK, -1)):
+        bbs = position.bitboards[color]
+        base = color * 6
+        for ptype in (PAWN, KNIGHT, BISHOP, ROOK, QUEEN, KING):
+            table = PIECE_SQUARE[base + ptype]
+            bb = bbs[ptype]
+            while bb:
+                low = bb & -bb
+                bb ^= low
+                score += sign * table[low.bit_length() - 1]
+    return score if position.side == WHITE else -score
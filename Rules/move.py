@@ -0,0 +1,57 @@
+"""Compact integer move encoding: from | to << 6 | flag << 12."""
+
+from Rules.bitboard import KNIGHT, PIECE_SYMBOLS, square_name
+
+
+QUIET = 0
+DOUBLE_PUSH = 1
+KING_CASTLE = 2
+QUEEN_CASTLE = 3
+CAPTURE = 4
+EP_CAPTURE = 5
+PROMOTION = 8          # 8..11 promote to knight, bishop, rook, queen
+PROMOTION_CAPTURE = 12  # 12..15 same, with a capture
+
+NULL_MOVE = 0
+
+
+def encode(from_sq: int, to_sq: int, flag: int = QUIET) -> int:
+    return from_sq | (to_sq << 6) | (flag << 12)
+
+
+def move_from(move: int) -> int:
+    return move & 63
+
+
+def move_to(move: int) -> int:
+    return (move >> 6) & 63
+
+
+def move_flag(move: int) -> int:
+    return move >> 12
+
+
+def is_capture(move: int) -> bool:
+    return bool((move >> 12) & CAPTURE)
+
+
+def is_promotion(move: int) -> bool:
+    return bool((move >> 12) & PROMOTION)
+
+
+def is_castle(move: int) -> bool:
+    return (move >> 12) in (KING_CASTLE, QUEEN_CASTLE)
+
+
+def promotion_piece(move: int) -> int:
+    """Piece type a promotion move creates (only valid for promotions)."""
+    return ((move >> 12) & 3) + KNIGHT
+
+
+def to_uci(move: int) -> str:
+    if move == NULL_MOVE:
+        return "0000"
+    uci = square_name(move & 63) + square_name((move >> 6) & 63)
+    if (move >> 12) & PROMOTION:
+        uci += PIECE_SYMBOLS[promotion_piece(move)]
+    return uci
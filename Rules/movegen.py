@@ -0,0 +1,213 @@
+"""Single-pass legal move generation from a check mask and pin rays."""
+
+from typing import TYPE_CHECKING, Callable, List
+
+from Rules.bitboard import (
+    WHITE, PAWN, KNIGHT, BISHOP, ROOK, QUEEN, KING,
+    FULL, RANK_1, RANK_3, RANK_6, RANK_8, NOT_FILE_A, NOT_FILE_H,
+    KNIGHT_ATTACKS, KING_ATTACKS, PAWN_ATTACKS, BETWEEN, LINE,
+    rook_attacks, bishop_attacks, queen_attacks,
+)
+from Rules.move import (
+    QUIET, DOUBLE_PUSH, KING_CASTLE, QUEEN_CASTLE, CAPTURE, EP_CAPTURE,
+    PROMOTION, PROMOTION_CAPTURE,
+)
+
+if TYPE_CHECKING:
+    from Rules.position import Position
+
+
+# Promotion flags, queen first so callers that auto-queen see it first
+PROMOTION_FLAGS = (3, 2, 1, 0)
+
+
+def legal_moves(position: "Position", captures_only: bool = False) -> List[int]:
+    """Every legal move in `position`, generated without trial-playing any of them.
+
+    The check mask (checker plus the squares between it and the king) and
+    each pinned piece's line to the king are computed once; every
+    generated target is intersected with them, so nothing is filtered
+    afterwards. Only en passant, whose captured pawn can uncover a rank
+    attack, is verified separately.
+
+    With `captures_only`, only captures and promotions are generated
+    (the moves a quiescence search looks at).
+    """
+    moves: List[int] = []
+    add = moves.append
+    us = position.side
+    them = us ^ 1
+    bbs = position.bitboards[us]
+    their = position.bitboards[them]
+    own = position.occupancy[us]
+    enemy = position.occupancy[them]
+    occupied = own | enemy
+    not_own = FULL ^ own
+    # Squares non-pawn moves may land on
+    landing = enemy if captures_only else not_own
+
+    king_sq = (bbs[KING] & -bbs[KING]).bit_length() - 1
+    checkers = position.attackers_to(king_sq, them)
+
+    # King steps: attacked squares are looked up in the attack map when one is
+    # tracked; otherwise tested with the king lifted off the board
+    targets = KING_ATTACKS[king_sq] & landing
+    if targets:
+        attacks = position.attacks
+        if attacks is not None:
+            targets &= ~(attacks.attacked[them] | _xray_through_king(position, checkers, king_sq))
+        without_king = occupied ^ (1 << king_sq)
+        while targets:
+            low = targets & -targets
+            targets ^= low
+            to_sq = low.bit_length() - 1
+            if attacks is None and position.attackers_to(to_sq, them, without_king):
+                continue
+            add(king_sq | (to_sq << 6) | ((CAPTURE if low & enemy else QUIET) << 12))
+
+    if checkers & (checkers - 1):
+        # Double check: only the king can move
+        return moves
+
+    if checkers:
+        check_mask = checkers | BETWEEN[king_sq][(checkers & -checkers).bit_length() - 1]
+    else:
+        check_mask = FULL
+        if not captures_only:
+            _add_castling_moves(position, add, occupied)
+
+    pinned = position.pinned(us)
+    pin_lines = LINE[king_sq]
+
+    # Pawns: unpinned ones set-wise, pinned ones one at a time along their pin line
+    pawns = bbs[PAWN]
+    pawn_mask = check_mask & (enemy | RANK_1 | RANK_8) if captures_only else check_mask
+    _add_pawn_moves(add, pawns & ~pinned, us, enemy, occupied, pawn_mask)
+    pinned_pawns = pawns & pinned
+    while pinned_pawns:
+        low = pinned_pawns & -pinned_pawns
+        pinned_pawns ^= low
+        _add_pawn_moves(add, low, us, enemy, occupied,
+                        pawn_mask & pin_lines[low.bit_length() - 1])
+
+    if position.ep_square is not None:
+        candidates = PAWN_ATTACKS[them][position.ep_square] & pawns
+        while candidates:
+            low = candidates & -candidates
+            candidates ^= low
+            move = (low.bit_length() - 1) | (position.ep_square << 6) | (EP_CAPTURE << 12)
+            if _ep_is_safe(position, move, king_sq, occupied):
+                add(move)
+
+    # Knights never move when pinned; sliders stay on their pin line
+    targets_mask = landing & check_mask
+    knights = bbs[KNIGHT] & ~pinned
+    while knights:
+        low = knights & -knights
+        knights ^= low
+        from_sq = low.bit_length() - 1
+        _add_targets(add, from_sq, KNIGHT_ATTACKS[from_sq] & targets_mask, enemy)
+
+    for ptype, attack_fn in ((BISHOP, bishop_attacks), (ROOK, rook_attacks), (QUEEN, queen_attacks)):
+        pieces = bbs[ptype]
+        while pieces:
+            low = pieces & -pieces
+            pieces ^= low
+            from_sq = low.bit_length() - 1
+            targets = attack_fn(from_sq, occupied) & targets_mask
+            if low & pinned:
+                targets &= pin_lines[from_sq]
+            _add_targets(add, from_sq, targets, enemy)
+
+    return moves
+
+
+def _add_targets(add: Callable[[int], None], from_sq: int, targets: int, enemy: int) -> None:
+    while targets:
+        low = targets & -targets
+        targets ^= low
+        add(from_sq | ((low.bit_length() - 1) << 6) | ((CAPTURE if low & enemy else QUIET) << 12))
+
+
+def _add_pawn_moves(add: Callable[[int], None], pawns: int, us: int,
+                    enemy: int, occupied: int, mask: int) -> None:
+    if not pawns:
+        return
+    empty = FULL ^ occupied
+    if us == WHITE:
+        single = (pawns << 8) & empty
+        double = ((single & RANK_3) << 8) & empty & mask
+        west = (pawns << 7) & NOT_FILE_H & enemy & mask
+        east = (pawns << 9) & NOT_FILE_A & enemy & mask
+        push, west_delta, east_delta, last_rank = 8, 7, 9, RANK_8
+    else:
+        single = (pawns >> 8) & empty
+        double = ((single & RANK_6) >> 8) & empty & mask
+        west = (pawns >> 9) & NOT_FILE_H & enemy & mask
+        east = (pawns >> 7) & NOT_FILE_A & enemy & mask
+        push, west_delta, east_delta, last_rank = -8, -9, -7, RANK_1
+    single &= mask
+
+    for targets, delta, flag in ((single, push, QUIET), (west, west_delta, CAPTURE),
+                                 (east, east_delta, CAPTURE)):
+        while targets:
+            low = targets & -targets
+            targets ^= low
+            to_sq = low.bit_length() - 1
+            from_sq = to_sq - delta
+            if low & last_rank:
+                base = PROMOTION_CAPTURE if flag == CAPTURE else PROMOTION
+                for promo in PROMOTION_FLAGS:
+                    add(from_sq | (to_sq << 6) | ((base | promo) << 12))
+            else:
+                add(from_sq | (to_sq << 6) | (flag << 12))
+
+    while double:
+        low = double & -double
+        double ^= low
+        to_sq = low.bit_length() - 1
+        add((to_sq - 2 * push) | (to_sq << 6) | (DOUBLE_PUSH << 12))
+
+
+def _add_castling_moves(position: "Position", add: Callable[[int], None], occupied: int) -> None:
+    """Castling, for a side that is not in check."""
+    us = position.side
+    rights = position.castling >> (2 * us) & 3
+    if not rights:
+        return
+    them = us ^ 1
+    king_sq = 4 if us == WHITE else 60
+
+    # Kingside: f and g empty and not attacked
+    if rights & 1 and not occupied & (0b11 << (king_sq + 1)):
+        if not position.is_attacked(king_sq + 1, them) and not position.is_attacked(king_sq + 2, them):
+            add(king_sq | ((king_sq + 2) << 6) | (KING_CASTLE << 12))
+    # Queenside: b, c and d empty; c and d not attacked
+    if rights & 2 and not occupied & (0b111 << (king_sq - 3)):
+        if not position.is_attacked(king_sq - 1, them) and not position.is_attacked(king_sq - 2, them):
+            add(king_sq | ((king_sq - 2) << 6) | (QUEEN_CASTLE << 12))
+
+
+def _ep_is_safe(position: "Position", move: int, king_sq: int, occupied: int) -> bool:
+    """En passant removes two pawns from a rank at once, so test the result directly."""
+    from_sq = move & 63
+    to_sq = (move >> 6) & 63
+    captured_sq = to_sq - 8 if position.side == WHITE else to_sq + 8
+    occupied = occupied ^ (1 << from_sq) ^ (1 << captured_sq) | (1 << to_sq)
+    return not (position.attackers_to(king_sq, position.side ^ 1, occupied) & ~(1 << captured_sq))
+
+
+def _xray_through_king(position: "Position", checkers: int, king_sq: int) -> int:
+    """Squares checking sliders would reach if the king stepped out of their way."""
+    occupied = position.occupied ^ (1 << king_sq)
+    danger = 0
+    while checkers:
+        low = checkers & -checkers
+        checkers ^= low
+        sq = low.bit_length() - 1
+        ptype = position.mailbox[sq] % 6
+        if ptype in (BISHOP, QUEEN):
+            danger |= bishop_attacks(sq, occupied)
+        if ptype in (ROOK, QUEEN):
+            danger |= rook_attacks(sq, occupied)
+    return danger
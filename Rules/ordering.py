@@ -0,0 +1,74 @@
+"""Move ordering for the search: hash move, MVV-LVA captures, killer moves, history."""
+
+from typing import TYPE_CHECKING, List
+
+from Rules.bitboard import PAWN, QUEEN
+from Rules.move import NULL_MOVE, EP_CAPTURE, CAPTURE, PROMOTION
+
+if TYPE_CHECKING:
+    from Rules.position import Position
+
+
+# Sort keys, highest searched first; history scores stay below KILLER_SCORE
+HASH_SCORE = 1 << 30
+CAPTURE_SCORE = 1 << 24
+KILLER_SCORE = 1 << 22
+HISTORY_LIMIT = KILLER_SCORE - 2
+MAX_PLY = 128
+
+
+class MoveOrderer:
+    def __init__(self) -> None:
+        # Two quiet moves per ply that recently caused a beta cutoff there
+        self.killers: List[List[int]] = [[NULL_MOVE, NULL_MOVE] for _ in range(MAX_PLY)]
+        # Butterfly history: history[color][from | to << 6], bumped by quiet cutoffs
+        self.history: List[List[int]] = [[0] * 4096, [0] * 4096]
+
+    def new_search(self) -> None:
+        """Forget killers and fade history, so the last move's statistics only guide."""
+        for killers in self.killers:
+            killers[0] = killers[1] = NULL_MOVE
+        for table in self.history:
+            for i, value in enumerate(table):
+                if value:
+                    table[i] = value >> 2
+
+    def order(self, position: "Position", moves: List[int], hash_move: int, ply: int) -> List[int]:
+        """Return `moves` sorted best-first for the side to move in `position`."""
+        mailbox = position.mailbox
+        killer_1, killer_2 = self.killers[ply]
+        history = self.history[position.side]
+
+        def score(move: int) -> int:
+            if move == hash_move:
+                return HASH_SCORE
+            flag = move >> 12
+            if flag & CAPTURE:
+                # MVV-LVA: most valuable victim first, cheapest attacker breaks ties
+                victim = PAWN if flag == EP_CAPTURE else mailbox[(move >> 6) & 63] % 6
+                attacker = mailbox[move & 63] % 6
+                promotion = (flag & 3) + 1 if flag & PROMOTION else 0
+                return CAPTURE_SCORE + (victim + promotion) * 8 - attacker
+            if flag & PROMOTION:
+                # Quiet queen promotions rank with captures; underpromotions go last
+                return CAPTURE_SCORE + QUEEN * 8 if flag & 3 == 3 else -1
+            if move == killer_1:
+                return KILLER_SCORE + 1
+            if move == killer_2:
+                return KILLER_SCORE
+            return history[move & 4095]
+
+        return sorted(moves, key=score, reverse=True)
+
+    def cutoff(self, side: int, move: int, depth: int, ply: int) -> None:
+        """Credit a quiet move that failed high at `ply` with `depth` plies left."""
+        killers = self.killers[ply]
+        if killers[0] != move:
+            killers[1] = killers[0]
+            killers[0] = move
+        table = self.history[side]
+        index = move & 4095
+        table[index] += depth * depth
+        if table[index] > HISTORY_LIMIT:
+            for i, value in enumerate(table):
+                table[i] = value >> 1
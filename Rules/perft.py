@@ -0,0 +1,133 @@
+"""Perft: count leaf nodes of the legal move tree to prove and time move generation.
+
+Usage:
+    python -m Rules.perft --depth 5
+    python -m Rules.perft --fen "<fen>" --depth 4 --divide --workers 8
+    python -m Rules.perft --suite
+"""
+
+import argparse
+import os
+import time
+from multiprocessing import Pool
+from typing import Dict, List, Optional, Tuple
+
+from Rules.move import to_uci
+from Rules.position import STARTING_FEN, Position
+
+
+# Reference positions with published node counts (chessprogramming.org "Perft Results")
+SUITE: List[Tuple[str, str, List[int]]] = [
+    ("start", STARTING_FEN,
+     [20, 400, 8902, 197281, 4865609]),
+    ("kiwipete", "r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1",
+     [48, 2039, 97862, 4085603]),
+    ("position3", "8/2p5/3p4/KP5r/1R3p1k/8/4P1P1/8 w - - 0 1",
+     [14, 191, 2812, 43238, 674624]),
+    ("position4", "r3k2r/Pppp1ppp/1b3nbN/nP6/BBP1P3/q4N2/Pp1P2PP/R2Q1RK1 w kq - 0 1",
+     [6, 264, 9467, 422333]),
+    ("position5", "rnbq1k1r/pp1Pbppp/2p5/8/2B5/8/PPP1NnPP/RNBQK2R w KQ - 1 8",
+     [44, 1486, 62379, 2103487]),
+    ("position6", "r4rk1/1pp1qppp/p1np1n2/2b1p1B1/2B1P1b1/P1NP1N2/1PP1QPPP/R4RK1 w - - 0 10",
+     [46, 2079, 89890, 3894594]),
+]
+
+
+def perft(position: Position, depth: int) -> int:
+    """Count leaf nodes `depth` plies below `position`."""
+    if depth == 0:
+        return 1
+    moves = position.legal_moves()
+    if depth == 1:
+        # Bulk counting: leaves do not need to be played
+        return len(moves)
+    nodes = 0
+    for move in moves:
+        undo = position.make_move(move)
+        nodes += perft(position, depth - 1)
+        position.unmake_move(undo)
+    return nodes
+
+
+def _perft_root_move(job: Tuple[Position, int, int]) -> Tuple[int, int]:
+    position, move, depth = job
+    undo = position.make_move(move)
+    nodes = perft(position, depth - 1)
+    position.unmake_move(undo)
+    return move, nodes
+
+
+def divide(position: Position, depth: int, workers: int = 1) -> Dict[str, int]:
+    """Node count per root move, with root moves spread across a process pool."""
+    if depth < 1:
+        raise ValueError("divide needs a depth of at least 1")
+    jobs = [(position, move, depth) for move in position.legal_moves()]
+    if workers > 1 and len(jobs) > 1:
+        with Pool(min(workers, len(jobs))) as pool:
+            results = pool.map(_perft_root_move, jobs, chunksize=1)
+    else:
+        results = [_perft_root_move(job) for job in jobs]
+    return {to_uci(move): nodes for move, nodes in results}
+
+
+def run(fen: str, depth: int, workers: int, show_divide: bool) -> Tuple[int, float]:
+    """Run a timed perft and print the summary line; returns (nodes, seconds)."""
+    position = Position.from_fen(fen)
+    start = time.perf_counter()
+    counts = divide(position, depth, workers)
+    elapsed = time.perf_counter() - start
+    nodes = sum(counts.values())
+
+    if show_divide:
+        for uci in sorted(counts):
+            print(f"{uci}: {counts[uci]}")
+        print()
+    print(f"depth {depth}: {nodes} nodes in {elapsed:.3f}s "
+          f"({nodes / elapsed if elapsed else 0:,.0f} nodes/sec, {workers} worker(s))")
+    return nodes, elapsed
+
+
+def run_suite(max_depth: Optional[int], workers: int) -> bool:
+    """Check every reference position; returns True when all counts match."""
+    passed = True
+    total_nodes = 0
+    total_time = 0.0
+    for name, fen, expected in SUITE:
+        position = Position.from_fen(fen)
+        for depth, want in enumerate(expected, start=1):
+            if max_depth is not None and depth > max_depth:
+                break
+            start = time.perf_counter()
+            got = sum(divide(position, depth, workers).values())
+            elapsed = time.perf_counter() - start
+            total_nodes += got
+            total_time += elapsed
+            status = "ok" if got == want else "FAIL"
+            passed &= got == want
+            print(f"{status:4} {name:10} depth {depth}: {got} (expected {want}) {elapsed:.3f}s")
+    if total_time:
+        print(f"{total_nodes} nodes in {total_time:.3f}s ({total_nodes / total_time:,.0f} nodes/sec)")
+    return passed
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Perft node counts for the rules core.")
+    parser.add_argument("--fen", default=STARTING_FEN, help="position to search (default: start)")
+    parser.add_argument("--depth", type=int, default=4)
+    parser.add_argument("--divide", action="store_true", help="print node counts per root move")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1,
+                        help="processes used to split root moves")
+    parser.add_argument("--suite", action="store_true",
+                        help="check the reference positions instead of a single FEN")
+    parser.add_argument("--max-depth", type=int, default=None,
+                        help="limit suite depth (default: every published depth)")
+    args = parser.parse_args(argv)
+
+    if args.suite:
+        return 0 if run_suite(args.max_depth, args.workers) else 1
+    run(args.fen, args.depth, args.workers, args.divide)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,197 @@
+"""Streaming PGN reader and game replayer.
+
+Games are read one at a time from any iterable of lines, so a file of any
+size is processed in constant memory. Replaying checks every move against
+the rules core, or, for archives already known to be clean, resolves the
+moves without generating legal moves at all.
+
+Usage:
+    python -m Rules.pgn games.pgn more.pgn           # check every game, report games/sec
+    python -m Rules.pgn archive.pgn --trusted        # skip legality checks
+"""
+
+import argparse
+import re
+import time
+from typing import Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple
+
+from Rules.position import STARTING_FEN, Position
+from Rules.san import parse_san, parse_trusted_san
+
+
+RESULTS = ("1-0", "0-1", "1/2-1/2", "*")
+
+_TAG = re.compile(r'\[\s*(\w+)\s+"((?:[^"\\]|\\.)*)"\s*\]')
+# A whole {comment} (or its opening part), a ; comment, a variation bracket, or a word;
+# comments, variations and NAGs are dropped, what is left is move numbers, SAN and results
+_TOKEN = re.compile(r"\{[^}]*\}?|[;()]|[^\s{};()]+")
+_MOVE_NUMBER = re.compile(r"^\d+\.+")
+
+
+class PgnGame(NamedTuple):
+    headers: Dict[str, str]
+    moves: List[str]  # SAN, mainline only
+
+    @property
+    def result(self) -> str:
+        return self.headers.get("Result", "*")
+
+    @property
+    def fen(self) -> str:
+        return self.headers.get("FEN", STARTING_FEN)
+
+
+def read_games(lines: Iterable[str]) -> Iterator[PgnGame]:
+    """Yield the games in `lines` (e.g. an open file) without reading the whole input."""
+    headers: Dict[str, str] = {}
+    moves: List[str] = []
+    depth = 0  # variation nesting
+    in_comment = False
+
+    for line in lines:
+        if not in_comment and depth == 0 and line.startswith("["):
+            match = _TAG.match(line)
+            if match:
+                if moves:
+                    # A tag section without a result token before it: close the last game
+                    yield PgnGame(headers, moves)
+                    headers, moves = {}, []
+                headers[match.group(1)] = match.group(2).replace('\\"', '"')
+                continue
+        if not in_comment and line.startswith("%"):
+            continue
+
+        pos = 0
+        if in_comment:
+            pos = line.find("}") + 1
+            if not pos:
+                continue
+            in_comment = False
+        for token in _TOKEN.findall(line, pos):
+            first = token[0]
+            if first == "{":
+                if token[-1] != "}":
+                    in_comment = True  # runs on to a later line
+                    break
+            elif first == ";":
+                break  # rest-of-line comment
+            elif first == "(":
+                depth += 1
+            elif first == ")":
+                depth -= 1
+            elif depth or first == "$":
+                continue
+            elif token in RESULTS:
+                headers.setdefault("Result", token)
+                yield PgnGame(headers, moves)
+                headers, moves = {}, []
+            else:
+                if first.isdigit():
+                    token = _MOVE_NUMBER.sub("", token)
+                    if not token:
+                        continue
+                moves.append(token)
+
+    if moves or headers:
+        yield PgnGame(headers, moves)
+
+
+class GameSummary(NamedTuple):
+    index: int  # position of the game in the input, from 0
+    headers: Dict[str, str]
+    plies: int  # moves replayed
+    fen: str  # position after the last move replayed
+    error: Optional[str] = None  # why replay stopped early; None if every move was played
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+
+def replay(game: PgnGame, validate: bool = True) -> Iterator[Tuple[Position, int]]:
+    """Yield (position, move) for each mainline move, the position being the one it is played from.
+
+    The same Position is updated in place between yields; copy() any you keep.
+    Raises ValueError for a bad FEN tag or at the first move that cannot be
+    resolved. validate=False trusts the moves to be legal (see parse_trusted_san).
+    """
+    position = Position.from_fen(game.fen)
+    resolve = parse_san if validate else parse_trusted_san
+    for san in game.moves:
+        move = resolve(position, san)
+        yield position, move
+        position.make_move(move)
+
+
+def replay_games(lines: Iterable[str], validate: bool = True) -> Iterator[GameSummary]:
+    """Replay every game in `lines`, yielding a summary of each; bad games are reported, not raised."""
+    for index, game in enumerate(read_games(lines)):
+        position = None
+        plies = 0
+        error = None
+        try:
+            # The generator plays each move when asked for the next one, so
+            # once it is exhausted `position` holds the final position
+            for plies, (position, _) in enumerate(replay(game, validate), 1):
+                pass
+        except ValueError as exc:
+            error = str(exc)
+        fen = position.to_fen() if position is not None else game.fen
+        yield GameSummary(index, game.headers, plies, fen, error)
+
+
+def game_positions(lines: Iterable[str], validate: bool = True) -> Iterator[Tuple[int, Position]]:
+    """(game index, position) for every position of every game, start and final positions included.
+
+    Positions are updated in place between yields; copy() any you keep. A
+    game stops at its first bad move; replay_games says which ones did.
+    """
+    resolve = parse_san if validate else parse_trusted_san
+    for index, game in enumerate(read_games(lines)):
+        try:
+            position = Position.from_fen(game.fen)
+        except ValueError:
+            continue
+        yield index, position
+        for san in game.moves:
+            try:
+                move = resolve(position, san)
+            except ValueError:
+                break
+            position.make_move(move)
+            yield index, position
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Replay PGN files through the rules core.")
+    parser.add_argument("pgn", nargs="+", help="PGN files to read")
+    parser.add_argument("--trusted", action="store_true",
+                        help="assume every move is legal; much faster, for clean archives")
+    parser.add_argument("--progress", type=int, default=100_000, metavar="GAMES",
+                        help="report the running rate every GAMES games (0: only at the end)")
+    args = parser.parse_args(argv)
+    validate = not args.trusted
+
+    games = plies = errors = 0
+    start = time.perf_counter()
+    for path in args.pgn:
+        with open(path, encoding="utf-8", errors="replace") as f:
+            for summary in replay_games(f, validate):
+                games += 1
+                plies += summary.plies
+                if not summary.ok:
+                    errors += 1
+                    print(f"{path}: game {summary.index + 1} ({summary.headers.get('Event', '?')}), "
+                          f"ply {summary.plies + 1}: {summary.error}")
+                if args.progress and games % args.progress == 0:
+                    elapsed = time.perf_counter() - start
+                    print(f"{games} games, {games / elapsed:,.0f} games/s", flush=True)
+
+    elapsed = time.perf_counter() - start
+    print(f"{games} games ({errors} with errors), {plies} plies in {elapsed:.1f}s: "
+          f"{games / elapsed:,.0f} games/s, {plies / elapsed:,.0f} plies/s")
+    return 1 if errors else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,426 @@
+"""Headless chess position built on 64-bit integer bitboards."""
+
+from typing import List, Optional, Tuple
+
+from Rules.bitboard import (
+    WHITE, BLACK, PAWN, KNIGHT, BISHOP, ROOK, QUEEN, KING,
+    PIECE_SYMBOLS, KNIGHT_ATTACKS, KING_ATTACKS, PAWN_ATTACKS, BETWEEN,
+    rook_attacks, bishop_attacks,
+    parse_square, square_name, lsb,
+)
+from Rules.move import (
+    DOUBLE_PUSH, KING_CASTLE, QUEEN_CASTLE, CAPTURE, EP_CAPTURE, PROMOTION,
+    to_uci,
+)
+from Rules.attacks import AttackMap
+from Rules.movegen import legal_moves
+from Rules.zobrist import PIECE_KEYS, SIDE_KEY, CASTLING_KEYS, EP_FILE_KEYS
+
+
+STARTING_FEN = "rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1"
+
+# Castling right bits
+WHITE_KINGSIDE, WHITE_QUEENSIDE, BLACK_KINGSIDE, BLACK_QUEENSIDE = 1, 2, 4, 8
+CASTLING_SYMBOLS = "KQkq"
+# Each right with the squares its king and rook must still stand on
+CASTLING_HOMES = ((WHITE_KINGSIDE, WHITE, 4, 7), (WHITE_QUEENSIDE, WHITE, 4, 0),
+                  (BLACK_KINGSIDE, BLACK, 60, 63), (BLACK_QUEENSIDE, BLACK, 60, 56))
+
+# FEN letter of each piece code (color * 6 + type), and back
+FEN_SYMBOLS = "PNBRQKpnbrqk"
+FEN_CODES = {symbol: code for code, symbol in enumerate(FEN_SYMBOLS)}
+# Digits expand to that many "." so every placement rank becomes eight characters
+FEN_EXPAND = str.maketrans({str(count): "." * count for count in range(1, 9)})
+FEN_SQUARE_SYMBOLS = frozenset(FEN_SYMBOLS + ".")
+BACK_RANKS = 0xFF000000000000FF
+
+# Rights that survive a move touching each square (king or rook leaving home)
+CASTLING_MASK = [15] * 64
+CASTLING_MASK[0] &= ~WHITE_QUEENSIDE
+CASTLING_MASK[7] &= ~WHITE_KINGSIDE
+CASTLING_MASK[4] &= ~(WHITE_KINGSIDE | WHITE_QUEENSIDE)
+CASTLING_MASK[56] &= ~BLACK_QUEENSIDE
+CASTLING_MASK[63] &= ~BLACK_KINGSIDE
+CASTLING_MASK[60] &= ~(BLACK_KINGSIDE | BLACK_QUEENSIDE)
+
+# make_move() undo record: (move, captured piece code or None, castling rights,
+# en-passant square, halfmove clock, Zobrist key)
+Undo = Tuple[int, Optional[int], int, Optional[int], int, int]
+
+
+class Position:
+    def __init__(self) -> None:
+        # bitboards[color][piece_type], occupancy[color]
+        self.bitboards: List[List[int]] = [[0] * 6, [0] * 6]
+        self.occupancy: List[int] = [0, 0]
+        # piece code per square: color * 6 + piece_type, or None when empty
+        self.mailbox: List[Optional[int]] = [None] * 64
+
+        self.side = WHITE
+        self.castling = 0
+        self.ep_square: Optional[int] = None
+        self.halfmove_clock = 0
+        self.fullmove_number = 1
+        # Zobrist key, kept up to date incrementally by _put/_remove/make_move
+        self.key = 0
+        # Optional incremental attack map; see track_attacks()
+        self.attacks: Optional[AttackMap] = None
+
+    # ==== Setup ====
+
+    @classmethod
+    def initial(cls) -> "Position":
+        return cls.from_fen(STARTING_FEN)
+
+    @classmethod
+    def from_fen(cls, fen: str) -> "Position":
+        """Parse a FEN; the move counters may be left out. Raises ValueError if invalid."""
+        fields = fen.split()
+        if len(fields) < 4:
+            raise ValueError(f"Invalid FEN: {fen!r}")
+
+        rows = fields[0].translate(FEN_EXPAND).split("/")
+        if len(rows) != 8 or any(len(row) != 8 for row in rows):
+            raise ValueError(f"Invalid FEN placement: {fields[0]!r}")
+        squares = "".join(reversed(rows))  # a1..h8
+        if not FEN_SQUARE_SYMBOLS.issuperset(squares):
+            raise ValueError(f"Invalid FEN placement: {fields[0]!r}")
+
+        position = cls()
+        position.mailbox = mailbox = list(map(FEN_CODES.get, squares))
+        boards = [0] * 12
+        key = 0
+        for sq, code in enumerate(mailbox):
+            if code is not None:
+                boards[code] |= 1 << sq
+                key ^= PIECE_KEYS[code][sq]
+        if boards[KING].bit_count() != 1 or boards[6 + KING].bit_count() != 1:
+            raise ValueError(f"Invalid FEN placement, each side needs one king: {fields[0]!r}")
+        if (boards[PAWN] | boards[6 + PAWN]) & BACK_RANKS:
+            raise ValueError(f"Invalid FEN placement, pawn on a back rank: {fields[0]!r}")
+        position.bitboards = [boards[:6], boards[6:]]
+        position.occupancy = [boards[0] | boards[1] | boards[2] | boards[3] | boards[4] | boards[5],
+                              boards[6] | boards[7] | boards[8] | boards[9] | boards[10] | boards[11]]
+
+        if fields[1] not in ("w", "b"):
+            raise ValueError(f"Invalid side to move: {fields[1]!r}")
+        position.side = WHITE if fields[1] == "w" else BLACK
+
+        if fields[2] != "-":
+            for char in fields[2]:
+                index = CASTLING_SYMBOLS.find(char)
+                if index < 0:
+                    raise ValueError(f"Invalid castling rights: {fields[2]!r}")
+                position.castling |= 1 << index
+            # A right whose king or rook has left home can never be used; drop it
+            for right, color, king_sq, rook_sq in CASTLING_HOMES:
+                if mailbox[king_sq] != color * 6 + KING or mailbox[rook_sq] != color * 6 + ROOK:
+                    position.castling &= ~right
+
+        if fields[3] != "-":
+            try:
+                ep = parse_square(fields[3])
+            except ValueError:
+                raise ValueError(f"Invalid en passant square: {fields[3]!r}") from None
+            # The pawn that just moved two squares stands in front of the ep
+            # square, which it crossed, and left the square behind it empty
+            back = -8 if position.side == WHITE else 8
+            if ((ep >> 3) != (5 if position.side == WHITE else 2)
+                    or mailbox[ep + back] != 6 * (position.side ^ 1) + PAWN
+                    or mailbox[ep] is not None or mailbox[ep - back] is not None):
+                raise ValueError(f"Invalid en passant square: {fields[3]!r}")
+            position.ep_square = ep
+            key ^= EP_FILE_KEYS[ep & 7]
+        if len(fields) >= 6:
+            try:
+                position.halfmove_clock = int(fields[4])
+                position.fullmove_number = int(fields[5])
+            except ValueError:
+                raise ValueError(f"Invalid FEN move counters: {fen!r}") from None
+        if position.attackers_to(lsb(boards[6 * (position.side ^ 1) + KING]), position.side):
+            raise ValueError(f"Invalid FEN, the side not to move is in check: {fen!r}")
+        if position.side == BLACK:
+            key ^= SIDE_KEY
+        position.key = key ^ CASTLING_KEYS[position.castling]
+        return position
+
+    def to_fen(self) -> str:
+        rows = []
+        mailbox = self.mailbox
+        for rank in range(7, -1, -1):
+            row = ""
+            empty = 0
+            for code in mailbox[rank * 8:rank * 8 + 8]:
+                if code is None:
+                    empty += 1
+                    continue
+                if empty:
+                    row += str(empty)
+                    empty = 0
+                row += FEN_SYMBOLS[code]
+            rows.append(row + str(empty) if empty else row)
+        castling = "".join(symbol for i, symbol in enumerate(CASTLING_SYMBOLS)
+                           if self.castling >> i & 1) or "-"
+        ep = square_name(self.ep_square) if self.ep_square is not None else "-"
+        side = "w" if self.side == WHITE else "b"
+        return f"{'/'.join(rows)} {side} {castling} {ep} {self.halfmove_clock} {self.fullmove_number}"
+
+    def copy(self) -> "Position":
+        position = Position.__new__(Position)
+        position.bitboards = [self.bitboards[0][:], self.bitboards[1][:]]
+        position.occupancy = self.occupancy[:]
+        position.mailbox = self.mailbox[:]
+        position.side = self.side
+        position.castling = self.castling
+        position.ep_square = self.ep_square
+        position.halfmove_clock = self.halfmove_clock
+        position.fullmove_number = self.fullmove_number
+        position.key = self.key
+        position.attacks = self.attacks.copy() if self.attacks is not None else None
+        return position
+
+    def track_attacks(self) -> "Position":
+        """Maintain an AttackMap from now on, so attack queries become lookups.
+
+        Worth it for long-lived positions such as the game board, where a
+        handful of moves are queried many times; search trees skip it.
+        """
+        self.attacks = AttackMap(self)
+        return self
+
+    def compute_key(self) -> int:
+        """Zobrist key from scratch; the incremental `key` must always equal this."""
+        key = 0
+        for sq, code in enumerate(self.mailbox):
+            if code is not None:
+                key ^= PIECE_KEYS[code][sq]
+        if self.side == BLACK:
+            key ^= SIDE_KEY
+        key ^= CASTLING_KEYS[self.castling]
+        if self.ep_square is not None:
+            key ^= EP_FILE_KEYS[self.ep_square & 7]
+        return key
+
+    def _put(self, sq: int, color: int, ptype: int) -> None:
+        bit = 1 << sq
+        code = color * 6 + ptype
+        self.bitboards[color][ptype] |= bit
+        self.occupancy[color] |= bit
+        self.mailbox[sq] = code
+        self.key ^= PIECE_KEYS[code][sq]
+
+    def _remove(self, sq: int) -> None:
+        code = self.mailbox[sq]
+        color, ptype = divmod(code, 6)
+        bit = 1 << sq
+        self.bitboards[color][ptype] ^= bit
+        self.occupancy[color] ^= bit
+        self.mailbox[sq] = None
+        self.key ^= PIECE_KEYS[code][sq]
+
+    # ==== Queries ====
+
+    def piece_at(self, sq: int) -> Optional[Tuple[int, int]]:
+        """Return (color, piece_type) on a square, or None if it is empty."""
+        code = self.mailbox[sq]
+        if code is None:
+            return None
+        return divmod(code, 6)
+
+    def king_square(self, color: int) -> int:
+        return lsb(self.bitboards[color][KING])
+
+    @property
+    def occupied(self) -> int:
+        return self.occupancy[WHITE] | self.occupancy[BLACK]
+
+    def attackers_to(self, sq: int, color: int, occupied: Optional[int] = None) -> int:
+        """Bitboard of `color` pieces attacking `sq` given an occupancy."""
+        if occupied is None:
+            if self.attacks is not None:
+                return self.attacks.attackers[color][sq]
+            occupied = self.occupancy[WHITE] | self.occupancy[BLACK]
+        bbs = self.bitboards[color]
+        return ((KNIGHT_ATTACKS[sq] & bbs[KNIGHT])
+                | (KING_ATTACKS[sq] & bbs[KING])
+                | (PAWN_ATTACKS[color ^ 1][sq] & bbs[PAWN])
+                | (bishop_attacks(sq, occupied) & (bbs[BISHOP] | bbs[QUEEN]))
+                | (rook_attacks(sq, occupied) & (bbs[ROOK] | bbs[QUEEN])))
+
+    def is_attacked(self, sq: int, by_color: int) -> bool:
+        if self.attacks is not None:
+            return bool(self.attacks.attacked[by_color] >> sq & 1)
+        return bool(self.attackers_to(sq, by_color))
+
+    def checkers(self) -> int:
+        return self.attackers_to(self.king_square(self.side), self.side ^ 1)
+
+    def in_check(self) -> bool:
+        return bool(self.checkers())
+
+    def pinned(self, color: int) -> int:
+        """Bitboard of `color` pieces pinned to their own king."""
+        king_sq = self.king_square(color)
+        them = self.bitboards[color ^ 1]
+        their_occ = self.occupancy[color ^ 1]
+        occupied = self.occupancy[WHITE] | self.occupancy[BLACK]
+
+        snipers = ((rook_attacks(king_sq, their_occ) & (them[ROOK] | them[QUEEN]))
+                   | (bishop_attacks(king_sq, their_occ) & (them[BISHOP] | them[QUEEN])))
+        between = BETWEEN[king_sq]
+        pinned = 0
+        while snipers:
+            low = snipers & -snipers
+            snipers ^= low
+            blockers = between[low.bit_length() - 1] & occupied
+            if blockers and not blockers & (blockers - 1) and blockers & self.occupancy[color]:
+                pinned |= blockers
+        return pinned
+
+    # ==== Move generation ====
+
+    def legal_moves(self, captures_only: bool = False) -> List[int]:
+        return legal_moves(self, captures_only)
+
+    def is_legal(self, move: int) -> bool:
+        return move in self.legal_moves()
+
+    def is_checkmate(self) -> bool:
+        return self.in_check() and not self.legal_moves()
+
+    def is_stalemate(self) -> bool:
+        return not self.in_check() and not self.legal_moves()
+
+    def parse_uci(self, uci: str) -> int:
+        for move in self.legal_moves():
+            if to_uci(move) == uci:
+                return move
+        raise ValueError(f"Illegal move in this position: {uci}")
+
+    # ==== Making moves ====
+
+    def play(self, move: int) -> "Position":
+        """Return the position after `move`; this position is left untouched."""
+        child = self.copy()
+        child.make_move(move)
+        return child
+
+    def _touched_squares(self, move: int, us: int) -> int:
+        """Squares whose occupant `move` changes, for the attack map."""
+        to_sq = (move >> 6) & 63
+        flag = move >> 12
+        touched = (1 << (move & 63)) | (1 << to_sq)
+        if flag == EP_CAPTURE:
+            touched |= 1 << (to_sq - 8 if us == WHITE else to_sq + 8)
+        elif flag == KING_CASTLE:
+            touched |= (1 << (to_sq + 1)) | (1 << (to_sq - 1))
+        elif flag == QUEEN_CASTLE:
+            touched |= (1 << (to_sq - 2)) | (1 << (to_sq + 1))
+        return touched
+
+    def make_move(self, move: int) -> Undo:
+        """Play `move` in place and return the record unmake_move() needs to revert it."""
+        from_sq = move & 63
+        to_sq = (move >> 6) & 63
+        flag = move >> 12
+        us = self.side
+        ptype = self.mailbox[from_sq] % 6
+        captured = None
+        undo = (move, None, self.castling, self.ep_square, self.halfmove_clock, self.key)
+
+        attacks = self.attacks
+        if attacks is not None:
+            touched = self._touched_squares(move, us)
+            stale_sliders = attacks.begin_move(self, touched)
+
+        self.halfmove_clock += 1
+        if flag & CAPTURE:
+            captured_sq = (to_sq - 8 if us == WHITE else to_sq + 8) if flag == EP_CAPTURE else to_sq
+            captured = self.mailbox[captured_sq]
+            self._remove(captured_sq)
+            self.halfmove_clock = 0
+            undo = (move, captured) + undo[2:]
+        if ptype == PAWN:
+            self.halfmove_clock = 0
+
+        self._remove(from_sq)
+        if flag & PROMOTION:
+            ptype = (flag & 3) + KNIGHT
+        self._put(to_sq, us, ptype)
+
+        if flag == KING_CASTLE:
+            self._remove(to_sq + 1)
+            self._put(to_sq - 1, us, ROOK)
+        elif flag == QUEEN_CASTLE:
+            self._remove(to_sq - 2)
+            self._put(to_sq + 1, us, ROOK)
+        if attacks is not None:
+            attacks.end_move(self, touched, stale_sliders)
+
+        key = self.key ^ SIDE_KEY ^ CASTLING_KEYS[self.castling]
+        if self.ep_square is not None:
+            key ^= EP_FILE_KEYS[self.ep_square & 7]
+        self.ep_square = (from_sq + to_sq) >> 1 if flag == DOUBLE_PUSH else None
+        if self.ep_square is not None:
+            key ^= EP_FILE_KEYS[self.ep_square & 7]
+        self.castling &= CASTLING_MASK[from_sq] & CASTLING_MASK[to_sq]
+        self.key = key ^ CASTLING_KEYS[self.castling]
+
+        if us == BLACK:
+            self.fullmove_number += 1
+        self.side = us ^ 1
+        return undo
+
+    def unmake_move(self, undo: Undo) -> None:
+        """Revert the move that produced `undo`; must be the most recent one made."""
+        move, captured, castling, ep_square, halfmove_clock, key = undo
+        from_sq = move & 63
+        to_sq = (move >> 6) & 63
+        flag = move >> 12
+        us = self.side ^ 1
+
+        attacks = self.attacks
+        if attacks is not None:
+            touched = self._touched_squares(move, us)
+            stale_sliders = attacks.begin_move(self, touched)
+
+        if flag == KING_CASTLE:
+            self._remove(to_sq - 1)
+            self._put(to_sq + 1, us, ROOK)
+        elif flag == QUEEN_CASTLE:
+            self._remove(to_sq + 1)
+            self._put(to_sq - 2, us, ROOK)
+
+        ptype = PAWN if flag & PROMOTION else self.mailbox[to_sq] % 6
+        self._remove(to_sq)
+        self._put(from_sq, us, ptype)
+        if captured is not None:
+            captured_sq = (to_sq - 8 if us == WHITE else to_sq + 8) if flag == EP_CAPTURE else to_sq
+            self._put(captured_sq, us ^ 1, captured % 6)
+
+        if attacks is not None:
+            attacks.end_move(self, touched, stale_sliders)
+
+        self.castling = castling
+        self.ep_square = ep_square
+        self.halfmove_clock = halfmove_clock
+        self.key = key
+        if us == BLACK:
+            self.fullmove_number -= 1
+        self.side = us
+
+    def __str__(self) -> str:
+        rows = []
+        for rank in range(7, -1, -1):
+            row = []
+            for file in range(8):
+                code = self.mailbox[rank * 8 + file]
+                if code is None:
+                    row.append(".")
+                else:
+                    symbol = PIECE_SYMBOLS[code % 6]
+                    row.append(symbol.upper() if code < 6 else symbol)
+            rows.append(" ".join(row))
+        side = "white" if self.side == WHITE else "black"
+        ep = square_name(self.ep_square) if self.ep_square is not None else "-"
+        return "\n".join(rows) + f"\n{side} to move, castling={self.castling}, ep={ep}"
@@ -0,0 +1,199 @@
+"""Standard Algebraic Notation (SAN): writing moves and resolving them against a position."""
+
+from typing import TYPE_CHECKING, List, Optional, Tuple
+
+from Rules.bitboard import (
+    WHITE, PAWN, KNIGHT, BISHOP, ROOK, QUEEN, KING, FILE_A, RANK_1, FILE_NAMES,
+    KNIGHT_ATTACKS, KING_ATTACKS, LINE, rook_attacks, bishop_attacks,
+    iter_bits, parse_square, square_name, lsb,
+)
+from Rules.move import (
+    QUIET, DOUBLE_PUSH, KING_CASTLE, QUEEN_CASTLE, CAPTURE, EP_CAPTURE, PROMOTION,
+    encode, is_capture, is_promotion, promotion_piece,
+)
+
+if TYPE_CHECKING:
+    from Rules.position import Position
+
+
+SAN_PIECES = "PNBRQK"
+
+
+def move_to_san(position: "Position", move: int, moves: Optional[List[int]] = None) -> str:
+    """SAN for a legal `move`, check and mate suffixes included.
+
+    `moves` may pass the position's legal moves when the caller already has them.
+    """
+    if moves is None:
+        moves = position.legal_moves()
+    from_sq = move & 63
+    to_sq = (move >> 6) & 63
+    flag = move >> 12
+    ptype = position.mailbox[from_sq] % 6
+
+    if flag == KING_CASTLE:
+        san = "O-O"
+    elif flag == QUEEN_CASTLE:
+        san = "O-O-O"
+    elif ptype == PAWN:
+        san = f"{FILE_NAMES[from_sq & 7]}x" if is_capture(move) else ""
+        san += square_name(to_sq)
+        if is_promotion(move):
+            san += "=" + SAN_PIECES[promotion_piece(move)]
+    else:
+        san = SAN_PIECES[ptype]
+        # Disambiguate by file, then by rank, then by both
+        rivals = [m & 63 for m in moves
+                  if (m >> 6) & 63 == to_sq and m & 63 != from_sq
+                  and position.mailbox[m & 63] % 6 == ptype]
+        if rivals:
+            if all(sq & 7 != from_sq & 7 for sq in rivals):
+                san += FILE_NAMES[from_sq & 7]
+            elif all(sq >> 3 != from_sq >> 3 for sq in rivals):
+                san += str((from_sq >> 3) + 1)
+            else:
+                san += square_name(from_sq)
+        if is_capture(move):
+            san += "x"
+        san += square_name(to_sq)
+
+    undo = position.make_move(move)
+    if position.in_check():
+        san += "#" if not position.legal_moves() else "+"
+    position.unmake_move(undo)
+    return san
+
+
+def _split_san(san: str) -> Tuple[int, int, str, Optional[int]]:
+    """(piece type, destination, disambiguation hint, promotion type or None) of non-castling SAN."""
+    text = san.rstrip("+#!?")
+    promotion = None
+    if "=" in text:
+        text, promo = text.split("=", 1)
+        promotion = SAN_PIECES.index(promo[:1].upper())
+    elif text[-1:] in "NBRQ" and len(text) > 2 and text[-2] in "18":
+        # Promotion written without '=', e.g. "e8Q"
+        promotion = SAN_PIECES.index(text[-1])
+        text = text[:-1]
+
+    ptype = PAWN
+    if text[:1] in SAN_PIECES[1:]:
+        ptype = SAN_PIECES.index(text[0])
+        text = text[1:]
+    text = text.replace("x", "").replace("-", "")
+    if len(text) < 2:
+        raise ValueError(f"Invalid SAN: {san}")
+    try:
+        to_sq = parse_square(text[-2:])
+    except (ValueError, IndexError):
+        raise ValueError(f"Invalid SAN: {san}") from None
+    return ptype, to_sq, text[:-2], promotion
+
+
+def _castle_flag(san: str) -> Optional[int]:
+    text = san.rstrip("+#!?")
+    if text in ("O-O", "0-0"):
+        return KING_CASTLE
+    if text in ("O-O-O", "0-0-0"):
+        return QUEEN_CASTLE
+    return None
+
+
+def parse_san(position: "Position", san: str, moves: Optional[List[int]] = None) -> int:
+    """Resolve SAN (e.g. "Nbd7", "exd6", "e8=Q+", "O-O") to a legal move; ValueError if none."""
+    if moves is None:
+        moves = position.legal_moves()
+    flag = _castle_flag(san)
+    if flag is not None:
+        for move in moves:
+            if move >> 12 == flag:
+                return move
+        raise ValueError(f"Illegal move in this position: {san}")
+
+    ptype, to_sq, hint, promotion = _split_san(san)
+    found = None
+    mailbox = position.mailbox
+    for move in moves:
+        if (move >> 6) & 63 != to_sq or mailbox[move & 63] % 6 != ptype:
+            continue
+        if ptype == KING and move >> 12 in (KING_CASTLE, QUEEN_CASTLE):
+            continue
+        if is_promotion(move) != (promotion is not None) \
+                or (promotion is not None and promotion_piece(move) != promotion):
+            continue
+        name = square_name(move & 63)
+        if any(ch not in name for ch in hint):
+            continue
+        if found is not None:
+            raise ValueError(f"Ambiguous SAN: {san}")
+        found = move
+    if found is None:
+        raise ValueError(f"Illegal move in this position: {san}")
+    return found
+
+
+def parse_trusted_san(position: "Position", san: str) -> int:
+    """parse_san for input already known to be legal, e.g. a validated game archive.
+
+    The mover is found from the attack tables instead of generating every
+    legal move, which makes replaying games several times faster. Only
+    ambiguity is resolved by legality (a pinned rival cannot move); an
+    illegal move that some piece could make is returned without complaint.
+    """
+    us = position.side
+    flag = _castle_flag(san)
+    if flag is not None:
+        king_sq = 4 if us == WHITE else 60
+        return encode(king_sq, king_sq + 2 if flag == KING_CASTLE else king_sq - 2, flag)
+
+    ptype, to_sq, hint, promotion = _split_san(san)
+    mailbox = position.mailbox
+    ours = position.bitboards[us]
+    flag = QUIET if mailbox[to_sq] is None else CAPTURE
+
+    if ptype == PAWN:
+        forward = 8 if us == WHITE else -8
+        if hint:
+            # A capture; the hint is the file the pawn comes from
+            from_sq = to_sq - forward + FILE_NAMES.index(hint[0]) - (to_sq & 7)
+            if flag == QUIET:
+                flag = EP_CAPTURE
+        else:
+            from_sq = to_sq - forward
+            if mailbox[from_sq] is None:
+                from_sq -= forward
+                flag = DOUBLE_PUSH
+        if not ours[PAWN] >> from_sq & 1:
+            raise ValueError(f"Illegal move in this position: {san}")
+        if promotion is not None:
+            flag = (flag & CAPTURE) | PROMOTION | (promotion - KNIGHT)
+        return encode(from_sq, to_sq, flag)
+
+    occupied = position.occupancy[0] | position.occupancy[1]
+    if ptype == KNIGHT:
+        reach = KNIGHT_ATTACKS[to_sq]
+    elif ptype == BISHOP:
+        reach = bishop_attacks(to_sq, occupied)
+    elif ptype == ROOK:
+        reach = rook_attacks(to_sq, occupied)
+    elif ptype == QUEEN:
+        reach = bishop_attacks(to_sq, occupied) | rook_attacks(to_sq, occupied)
+    else:
+        reach = KING_ATTACKS[to_sq]
+    candidates = reach & ours[ptype]
+    for ch in hint:
+        if ch in FILE_NAMES:
+            candidates &= FILE_A << FILE_NAMES.index(ch)
+        elif "1" <= ch <= "8":
+            candidates &= RANK_1 << 8 * (ord(ch) - 49)
+    if candidates & (candidates - 1):
+        # Written without disambiguation because the other pieces are pinned
+        king_sq = position.king_square(us)
+        for from_sq in iter_bits(candidates & position.pinned(us)):
+            if not LINE[king_sq][from_sq] >> to_sq & 1:
+                candidates ^= 1 << from_sq
+        if candidates & (candidates - 1):
+            raise ValueError(f"Ambiguous SAN: {san}")
+    if not candidates:
+        raise ValueError(f"Illegal move in this position: {san}")
+    return encode(lsb(candidates), to_sq, flag)
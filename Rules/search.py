@@ -0,0 +1,407 @@
+"""Negamax alpha-beta search with iterative deepening and aspiration windows.
+
+Usage:
+    python -m Rules.search --depth 6
+    python -m Rules.search --fen "<fen>" --time 5
+    python -m Rules.search --nodes 200000
+"""
+
+import argparse
+import time
+from typing import Callable, Iterable, List, NamedTuple, Optional
+
+from Rules.evaluate import evaluate
+from Rules.move import NULL_MOVE, CAPTURE, is_capture, is_promotion, to_uci
+from Rules.ordering import MoveOrderer
+from Rules.see import SEE_VALUES, see
+from Rules.position import STARTING_FEN, Position
+from Rules.tablebase import DRAW as TB_DRAW, WIN as TB_WIN, Probe, Tablebases
+from Rules.tt import BOUND_EXACT, BOUND_LOWER, BOUND_UPPER, TranspositionTable
+
+
+INFINITY = 32001
+MATE = 32000
+# Scores beyond this are mates; the distance to mate is MATE - abs(score) plies
+MATE_BOUND = MATE - 1000
+DRAW = 0
+MAX_PLY = 128
+
+# First aspiration window half-width; doubled after every fail-high/low
+ASPIRATION_WINDOW = 25
+# Limits are checked every this many nodes
+CHECK_INTERVAL = 1024
+
+
+class SearchResult(NamedTuple):
+    move: int
+    score: int
+    depth: int
+    nodes: int
+    seconds: float
+    pv: List[int]
+
+    @property
+    def nps(self) -> float:
+        return self.nodes / self.seconds if self.seconds else 0.0
+
+    def __str__(self) -> str:
+        return (f"depth {self.depth} score {format_score(self.score)} nodes {self.nodes} "
+                f"nps {self.nps:,.0f} time {self.seconds:.3f} "
+                f"pv {' '.join(to_uci(move) for move in self.pv)}")
+
+
+class SearchAborted(Exception):
+    """Raised inside the tree when a limit is hit; the unfinished iteration is discarded."""
+
+
+def format_score(score: int) -> str:
+    if abs(score) >= MATE_BOUND:
+        plies = MATE - abs(score)
+        return f"mate {(plies + 1) // 2 if score > 0 else -((plies + 1) // 2)}"
+    return f"cp {score}"
+
+
+def tablebase_score(probe: Probe, ply: int) -> int:
+    """Search score of a tablebase result `ply` plies from the root."""
+    if probe.result == TB_DRAW:
+        return DRAW
+    score = MATE - ply - probe.plies
+    return score if probe.result == TB_WIN else -score
+
+
+def score_to_tt(score: int, ply: int) -> int:
+    """Mate scores are stored as distance from the entry's node, not from the root."""
+    if score >= MATE_BOUND:
+        return score + ply
+    if score <= -MATE_BOUND:
+        return score - ply
+    return score
+
+
+def score_from_tt(score: int, ply: int) -> int:
+    if score >= MATE_BOUND:
+        return score - ply
+    if score <= -MATE_BOUND:
+        return score + ply
+    return score
+
+
+class Searcher:
+    def __init__(self, hash_mb: float = 16, tt: Optional[TranspositionTable] = None,
+                 tablebases: Optional[Tablebases] = None) -> None:
+        # Pass `tt` to search with a table shared with other searchers
+        self.tt = tt if tt is not None else TranspositionTable(hash_mb)
+        # Endgames covered by the tablebases are looked up instead of searched
+        self.tablebases = tablebases
+        self.orderer = MoveOrderer()
+        self.nodes = 0
+        self.start_time = 0.0
+        self.time_limit: Optional[float] = None
+        self.node_limit: Optional[int] = None
+        self.stopped = False
+        # Set by stop() until clear_stop(), so a stop that comes before the search starts is kept
+        self.stop_requested = False
+        # Anything with is_set(), e.g. a multiprocessing.Event, that stops the search when set
+        self.stop_event = None
+        # Zobrist keys from the game start to the current search node, for repetitions
+        self.keys: List[int] = []
+        # Triangular principal-variation table
+        self.pv_table: List[List[int]] = [[NULL_MOVE] * MAX_PLY for _ in range(MAX_PLY)]
+        self.pv_length: List[int] = [0] * MAX_PLY
+        self.result: Optional[SearchResult] = None
+
+    def stop(self) -> None:
+        """Ask a running search (e.g. on another thread) to return its best move so far.
+
+        The request also holds for searches started later, until clear_stop().
+        """
+        self.stop_requested = True
+        self.stopped = True
+
+    def clear_stop(self) -> None:
+        """Forget earlier stop() calls; do this before handing out a new search."""
+        self.stop_requested = False
+
+    def search(self, position: Position, max_depth: int = MAX_PLY - 1,
+               time_limit: Optional[float] = None, node_limit: Optional[int] = None,
+               history: Iterable[int] = (),
+               on_iteration: Optional[Callable[[SearchResult], None]] = None,
+               start_depth: int = 1) -> SearchResult:
+        """Search `position` until a depth, time (seconds) or node limit is reached.
+
+        `history` holds the Zobrist keys of the positions played before this
+        one (the root's own key may be included) so repetitions count as draws.
+        Iterations begin at `start_depth`. The position itself is not
+        modified. Raises ValueError when there is no legal move.
+
+        A root covered by the tablebases is not searched at all: the result
+        is the fastest mate (or longest defence) with depth 0.
+        """
+        root = position.copy()
+        # The search tree never queries one position often enough to pay for an attack map
+        root.attacks = None
+        root_moves = root.legal_moves()
+        if not root_moves:
+            raise ValueError("no legal moves to search")
+
+        self.nodes = 0
+        self.start_time = time.perf_counter()
+        self.time_limit = time_limit
+        self.node_limit = node_limit
+        self.stopped = self.stop_requested
+        self.keys = list(history)
+        if not self.keys or self.keys[-1] != root.key:
+            self.keys.append(root.key)
+        self.result = None
+        self.tt.new_search()
+        self.tt.reset_stats()
+        self.orderer.new_search()
+
+        if self.tablebases is not None and self.tablebases.probe(root) is not None:
+            solved = self.tablebases.root_moves(root)
+            if solved:
+                move, probe = solved[0]
+                self.result = SearchResult(move, tablebase_score(probe, 0), 0, 0,
+                                           self._elapsed(), [move])
+                if on_iteration is not None:
+                    on_iteration(self.result)
+                return self.result
+
+        score = 0
+        for depth in range(max(1, min(start_depth, max_depth)), min(max_depth, MAX_PLY - 1) + 1):
+            try:
+                score = self._aspiration(root, root_moves, depth, score)
+            except SearchAborted:
+                break
+            self.result = SearchResult(
+                self.pv_table[0][0], score, depth, self.nodes, self._elapsed(),
+                self.pv_table[0][:self.pv_length[0]])
+            if on_iteration is not None:
+                on_iteration(self.result)
+            # Best move first in the next iteration
+            root_moves.remove(self.result.move)
+            root_moves.insert(0, self.result.move)
+            if abs(score) >= MATE_BOUND or len(root_moves) == 1:
+                break
+            # The next iteration costs several times this one; do not start what cannot finish
+            if time_limit is not None and self._elapsed() > time_limit / 2:
+                break
+
+        if self.result is None:
+            # Stopped before depth 1 finished (only possible from stop())
+            self.result = SearchResult(root_moves[0], 0, 0, self.nodes, self._elapsed(), [root_moves[0]])
+        return self.result
+
+    def _elapsed(self) -> float:
+        return time.perf_counter() - self.start_time
+
+    def _check_limits(self) -> None:
+        # The first iteration always finishes so there is a move to return
+        if self.result is None and not self.stopped:
+            return
+        if self.stopped or (self.stop_event is not None and self.stop_event.is_set()) or (self.node_limit is not None and self.nodes >= self.node_limit) \
+                or (self.time_limit is not None and self._elapsed() >= self.time_limit):
+            self.stopped = True
+            raise SearchAborted
+
+    # ==== Search ====
+
+    def _aspiration(self, root: Position, root_moves: List[int], depth: int, guess: int) -> int:
+        """Search with a narrow window around the last score, widening it on failure."""
+        if depth < 3 or abs(guess) >= MATE_BOUND:
+            return self._search_root(root, root_moves, depth, -INFINITY, INFINITY)
+        delta = ASPIRATION_WINDOW
+        alpha, beta = guess - delta, guess + delta
+        while True:
+            score = self._search_root(root, root_moves, depth, alpha, beta)
+            if score <= alpha:
+                alpha = max(score - delta, -INFINITY)
+            elif score >= beta:
+                beta = min(score + delta, INFINITY)
+            else:
+                return score
+            delta *= 2
+
+    def _search_root(self, root: Position, root_moves: List[int], depth: int,
+                     alpha: int, beta: int) -> int:
+        best = -INFINITY
+        alpha_orig = alpha
+        self.pv_length[0] = 0
+        for move in root_moves:
+            undo = root.make_move(move)
+            self.keys.append(root.key)
+            score = -self._negamax(root, depth - 1, -beta, -alpha, 1)
+            self.keys.pop()
+            root.unmake_move(undo)
+            if score > best:
+                best = score
+                if score > alpha:
+                    alpha = score
+                    self._update_pv(0, move)
+                    if alpha >= beta:
+                        break
+        if self.pv_length[0] == 0:
+            # Failed low: keep the previous best move at the head of the PV
+            self.pv_table[0][0] = root_moves[0]
+            self.pv_length[0] = 1
+        self._store(root, self.pv_table[0][0], best, depth, alpha_orig, beta, 0)
+        return best
+
+    def _negamax(self, position: Position, depth: int, alpha: int, beta: int, ply: int) -> int:
+        self.nodes += 1
+        if self.nodes % CHECK_INTERVAL == 0 or self.stopped:
+            self._check_limits()
+        self.pv_length[ply] = ply
+
+        if self._is_draw(position):
+            return DRAW
+        if self.tablebases is not None:
+            probe = self.tablebases.probe(position)
+            if probe is not None:
+                return tablebase_score(probe, ply)
+        if depth <= 0 or ply >= MAX_PLY - 1:
+            return self._quiesce(position, alpha, beta, ply)
+
+        hash_move = NULL_MOVE
+        entry = self.tt.probe(position.key)
+        if entry is not None:
+            hash_move, tt_score, tt_depth, bound = entry
+            if tt_depth >= depth:
+                tt_score = score_from_tt(tt_score, ply)
+                if bound == BOUND_EXACT or (bound == BOUND_LOWER and tt_score >= beta) \
+                        or (bound == BOUND_UPPER and tt_score <= alpha):
+                    return tt_score
+
+        moves = position.legal_moves()
+        if not moves:
+            return -MATE + ply if position.in_check() else DRAW
+
+        best = -INFINITY
+        best_move = NULL_MOVE
+        alpha_orig = alpha
+        for move in self.orderer.order(position, moves, hash_move, ply):
+            undo = position.make_move(move)
+            self.keys.append(position.key)
+            score = -self._negamax(position, depth - 1, -beta, -alpha, ply + 1)
+            self.keys.pop()
+            position.unmake_move(undo)
+            if score > best:
+                best = score
+                if score > alpha:
+                    alpha = score
+                    best_move = move
+                    self._update_pv(ply, move)
+                    if alpha >= beta:
+                        if not is_capture(move) and not is_promotion(move):
+                            self.orderer.cutoff(position.side, move, depth, ply)
+                        break
+        self._store(position, best_move, best, depth, alpha_orig, beta, ply)
+        return best
+
+    def _quiesce(self, position: Position, alpha: int, beta: int, ply: int) -> int:
+        """Search captures and queen promotions only, until the position is quiet.
+
+        The side to move may stand pat on the static evaluation, except in
+        check, where every evasion is searched so mates are still seen.
+        Captures that lose material by SEE are skipped.
+        """
+        self.nodes += 1
+        if self.nodes % CHECK_INTERVAL == 0 or self.stopped:
+            self._check_limits()
+        self.pv_length[ply] = ply
+
+        in_check = position.in_check()
+        if in_check:
+            moves = position.legal_moves()
+            if not moves:
+                return -MATE + ply
+            if ply >= MAX_PLY - 1:
+                return evaluate(position)
+            best = -INFINITY
+        else:
+            best = evaluate(position)
+            if best >= beta or ply >= MAX_PLY - 1:
+                return best
+            alpha = max(alpha, best)
+            # Underpromotions are left out; they almost never matter for material
+            moves = [move for move in position.legal_moves(captures_only=True)
+                     if move >> 12 & CAPTURE or move >> 12 & 3 == 3]
+
+        mailbox = position.mailbox
+        for move in self.orderer.order(position, moves, NULL_MOVE, ply):
+            flag = move >> 12
+            if not in_check and flag == CAPTURE \
+                    and SEE_VALUES[mailbox[(move >> 6) & 63] % 6] < SEE_VALUES[mailbox[move & 63] % 6] \
+                    and see(position, move) < 0:
+                # Only a capture by a more valuable piece can lose the exchange
+                continue
+            undo = position.make_move(move)
+            self.keys.append(position.key)
+            score = -self._quiesce(position, -beta, -alpha, ply + 1)
+            self.keys.pop()
+            position.unmake_move(undo)
+            if score > best:
+                best = score
+                if score > alpha:
+                    alpha = score
+                    self._update_pv(ply, move)
+                    if alpha >= beta:
+                        break
+        return best
+
+    def _store(self, position: Position, move: int, score: int, depth: int,
+               alpha: int, beta: int, ply: int) -> None:
+        """Record a searched node; `alpha` and `beta` are the window it was searched with."""
+        if score >= beta:
+            bound = BOUND_LOWER
+        elif score > alpha:
+            bound = BOUND_EXACT
+        else:
+            # Failed low: no move is known to be best
+            bound, move = BOUND_UPPER, NULL_MOVE
+        self.tt.store(position.key, move, score_to_tt(score, ply), depth, bound)
+
+    def _is_draw(self, position: Position) -> bool:
+        """Fifty-move rule, or any repetition since the last irreversible move."""
+        if position.halfmove_clock >= 100:
+            return True
+        keys = self.keys
+        # keys[-1] is this position; same side to move means stepping back two plies
+        last = len(keys) - 1
+        for i in range(last - 2, max(last - position.halfmove_clock, 0) - 1, -2):
+            if keys[i] == keys[last]:
+                return True
+        return False
+
+    def _update_pv(self, ply: int, move: int) -> None:
+        row = self.pv_table[ply]
+        child = self.pv_table[ply + 1]
+        row[ply] = move
+        length = self.pv_length[ply + 1]
+        row[ply + 1:length] = child[ply + 1:length]
+        self.pv_length[ply] = length
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Search a position with the built-in engine.")
+    parser.add_argument("--fen", default=STARTING_FEN, help="position to search (default: start)")
+    parser.add_argument("--depth", type=int, default=None, help="maximum depth in plies")
+    parser.add_argument("--time", type=float, default=None, help="time limit in seconds")
+    parser.add_argument("--nodes", type=int, default=None, help="node limit")
+    parser.add_argument("--hash", type=float, default=16, help="transposition table size in MB")
+    parser.add_argument("--tablebases", default=None, help="directory of endgame tables")
+    args = parser.parse_args(argv)
+
+    max_depth = args.depth
+    if max_depth is None:
+        max_depth = MAX_PLY - 1 if args.time is not None or args.nodes is not None else 5
+    searcher = Searcher(args.hash, tablebases=Tablebases(args.tablebases) if args.tablebases else None)
+    result = searcher.search(Position.from_fen(args.fen), max_depth, args.time, args.nodes,
+                             on_iteration=print)
+    print(searcher.tt.stats())
+    print(f"bestmove {to_uci(result.move)}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
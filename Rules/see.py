@@ -0,0 +1,117 @@
+"""Static exchange evaluation: the material result of a capture sequence on one square.
+
+Works from attacker bitboards (the position's AttackMap when it tracks
+one), removing each capturer from the occupancy and adding the sliders
+it uncovers, so nothing is ever made or unmade on the position.
+"""
+
+from typing import TYPE_CHECKING
+
+from Rules.bitboard import (
+    WHITE, BLACK, PAWN, KNIGHT, BISHOP, ROOK, QUEEN, KING,
+    rook_attacks, bishop_attacks,
+)
+from Rules.move import CAPTURE, EP_CAPTURE, PROMOTION, encode
+
+if TYPE_CHECKING:
+    from Rules.position import Position
+
+
+# Exchange values; the king is priced so that capturing into a defended square never pays
+SEE_VALUES = (100, 320, 330, 500, 900, 20000)
+
+
+def see(position: "Position", move: int) -> int:
+    """Material gained by the mover of `move` once the exchange on its square settles.
+
+    Each side may stop capturing whenever continuing would lose material.
+    Pins are ignored, as usual for SEE. The mover need not be the side to move.
+    """
+    from_sq = move & 63
+    to_sq = (move >> 6) & 63
+    flag = move >> 12
+    mailbox = position.mailbox
+    bitboards = position.bitboards
+    occupied = position.occupied
+
+    us = mailbox[from_sq] // 6
+    if flag == EP_CAPTURE:
+        victim_value = SEE_VALUES[PAWN]
+        # The captured pawn stands beside the target, not on it
+        occupied ^= 1 << (to_sq - 8 if us == WHITE else to_sq + 8)
+    elif flag & CAPTURE:
+        victim_value = SEE_VALUES[mailbox[to_sq] % 6]
+    else:
+        victim_value = 0
+
+    attacker_type = mailbox[from_sq] % 6
+    gain = [victim_value]
+    if flag & PROMOTION:
+        attacker_type = (flag & 3) + 1
+        gain[0] += SEE_VALUES[attacker_type] - SEE_VALUES[PAWN]
+
+    diagonal = (bitboards[WHITE][BISHOP] | bitboards[WHITE][QUEEN]
+                | bitboards[BLACK][BISHOP] | bitboards[BLACK][QUEEN])
+    straight = (bitboards[WHITE][ROOK] | bitboards[WHITE][QUEEN]
+                | bitboards[BLACK][ROOK] | bitboards[BLACK][QUEEN])
+
+    occupied ^= 1 << from_sq
+    if position.attacks is not None and flag != EP_CAPTURE:
+        attackers = position.attacks.attackers[WHITE][to_sq] | position.attacks.attackers[BLACK][to_sq]
+    else:
+        attackers = position.attackers_to(to_sq, WHITE, occupied) | position.attackers_to(to_sq, BLACK, occupied)
+    # Sliders behind the first capturer join in once it has left
+    attackers = (attackers | (bishop_attacks(to_sq, occupied) & diagonal)
+                 | (rook_attacks(to_sq, occupied) & straight)) & occupied
+
+    side = us ^ 1
+    while True:
+        # The piece now on the square is worth capturing only if the recapture does not lose
+        gain.append(SEE_VALUES[attacker_type] - gain[-1])
+        if max(-gain[-2], gain[-1]) < 0:
+            break
+        side_attackers = attackers & position.occupancy[side]
+        if not side_attackers:
+            break
+        bbs = bitboards[side]
+        for attacker_type in (PAWN, KNIGHT, BISHOP, ROOK, QUEEN, KING):
+            candidates = side_attackers & bbs[attacker_type]
+            if candidates:
+                break
+        if attacker_type == KING and attackers & position.occupancy[side ^ 1]:
+            # The king may not capture onto a square the other side still attacks
+            break
+        occupied ^= candidates & -candidates
+        attackers = (attackers | (bishop_attacks(to_sq, occupied) & diagonal)
+                     | (rook_attacks(to_sq, occupied) & straight)) & occupied
+        side ^= 1
+
+    # The last entry is a capture nobody can make; fold the rest back to the root
+    gain.pop()
+    for d in range(len(gain) - 1, 0, -1):
+        gain[d - 1] = -max(-gain[d - 1], gain[d])
+    return gain[0]
+
+
+def hanging_pieces(position: "Position", color: int) -> int:
+    """Bitboard of `color` pieces (king excluded) the opponent can win material by capturing."""
+    them = color ^ 1
+    bbs = position.bitboards[them]
+    hanging = 0
+    pieces = position.occupancy[color] & ~position.bitboards[color][KING]
+    while pieces:
+        low = pieces & -pieces
+        pieces ^= low
+        sq = low.bit_length() - 1
+        attackers = position.attackers_to(sq, them)
+        if not attackers:
+            continue
+        # Try the exchange starting with the cheapest attacker
+        for ptype in (PAWN, KNIGHT, BISHOP, ROOK, QUEEN, KING):
+            candidates = attackers & bbs[ptype]
+            if candidates:
+                break
+        from_sq = (candidates & -candidates).bit_length() - 1
+        if see(position, encode(from_sq, sq, CAPTURE)) > 0:
+            hanging |= low
+    return hanging
@@ -0,0 +1,167 @@
+"""Lazy SMP: several search processes sharing one transposition table in shared memory.
+
+Every worker searches the same root with its own Searcher; they only
+cooperate through the shared table, where each finds the others' results
+and cutoffs. Odd-numbered workers start one iteration deeper so the
+workers do not walk the same tree in lockstep.
+
+Usage:
+    python -m Rules.smp --workers 1 2 4 8 --depth 6
+    python -m Rules.smp --fen "<fen>" --workers 16 --time 10
+"""
+
+import argparse
+import os
+import time
+from multiprocessing import Event, Pool
+from multiprocessing.shared_memory import SharedMemory
+from typing import Iterable, List, Optional, Tuple
+
+from Rules.move import to_uci
+from Rules.position import STARTING_FEN, Position
+from Rules.search import MAX_PLY, SearchResult, Searcher, format_score
+from Rules.tablebase import Tablebases
+from Rules.tt import TranspositionTable, table_bytes
+
+
+# Per-process state, set up once by _init_worker
+_memory: Optional[SharedMemory] = None
+_searcher: Optional[Searcher] = None
+
+# Job sent to a worker: (worker index, position, max depth, time limit,
+# node limit, history keys, table age)
+Job = Tuple[int, Position, int, Optional[float], Optional[int], List[int], int]
+
+
+def _init_worker(name: str, hash_mb: float, stop_event, tablebase_dir: Optional[str]) -> None:
+    global _memory, _searcher
+    _memory = SharedMemory(name=name)
+    # Each worker maps the tables itself; the pages are shared through the OS cache
+    tablebases = Tablebases(tablebase_dir) if tablebase_dir else None
+    _searcher = Searcher(tt=TranspositionTable(hash_mb, _memory.buf), tablebases=tablebases)
+    _searcher.stop_event = stop_event
+
+
+def _search_job(job: Job) -> Tuple[int, SearchResult]:
+    index, position, max_depth, time_limit, node_limit, history, age = job
+    # Every worker ages the shared table the same way, from the master's count
+    _searcher.tt.age = age
+    result = _searcher.search(position, max_depth, time_limit, node_limit, history,
+                              start_depth=1 + index % 2)
+    return index, result
+
+
+class ParallelSearcher:
+    """Same interface as Searcher (search, stop), spread across `workers` processes."""
+
+    def __init__(self, workers: int = os.cpu_count() or 1, hash_mb: float = 16,
+                 tablebase_dir: Optional[str] = None) -> None:
+        self.workers = max(1, workers)
+        self.hash_mb = hash_mb
+        self.memory = SharedMemory(create=True, size=table_bytes(hash_mb))
+        self.memory.buf[:] = bytes(self.memory.size)
+        self.stop_event = Event()
+        self.pool = Pool(self.workers, initializer=_init_worker,
+                         initargs=(self.memory.name, hash_mb, self.stop_event, tablebase_dir))
+        self.age = 0
+        # Set by stop() until clear_stop(), so a stop that comes before the search starts is kept
+        self.stop_requested = False
+        # Results of the last search, indexed by worker
+        self.worker_results: List[SearchResult] = []
+
+    def stop(self) -> None:
+        self.stop_requested = True
+        self.stop_event.set()
+
+    def clear_stop(self) -> None:
+        """Forget earlier stop() calls; do this before handing out a new search."""
+        self.stop_requested = False
+
+    def close(self) -> None:
+        """Shut the workers down and free the shared table."""
+        if self.pool is None:
+            return
+        self.stop_event.set()
+        self.pool.terminate()
+        self.pool.join()
+        self.pool = None
+        self.memory.close()
+        self.memory.unlink()
+
+    def search(self, position: Position, max_depth: int = MAX_PLY - 1,
+               time_limit: Optional[float] = None, node_limit: Optional[int] = None,
+               history: Iterable[int] = ()) -> SearchResult:
+        """Search on every worker; returns the deepest result, with the total node count.
+
+        Worker 0 runs the plain iterative deepening; once it finishes the
+        helpers are stopped. `node_limit` is shared out between the workers.
+        """
+        start = time.perf_counter()
+        # The event also stops the helpers after every search; a pending stop() must survive that
+        self.stop_event.clear()
+        if self.stop_requested:
+            self.stop_event.set()
+        history = list(history)
+        worker_nodes = None if node_limit is None else max(1, node_limit // self.workers)
+        jobs = [self.pool.apply_async(_search_job, ((index, position, max_depth, time_limit,
+                                                     worker_nodes, history, self.age),))
+                for index in range(self.workers)]
+        self.age = (self.age + 1) & 63
+
+        first = jobs[0].get()[1]
+        self.stop_event.set()
+        results = [first] + [job.get()[1] for job in jobs[1:]]
+        self.worker_results = results
+
+        # Deepest completed iteration wins; worker 0 on ties
+        best = max(results, key=lambda result: result.depth)
+        if best.depth == first.depth:
+            best = first
+        nodes = sum(result.nodes for result in results)
+        return best._replace(nodes=nodes, seconds=time.perf_counter() - start)
+
+
+def benchmark(fen: str, worker_counts: List[int], depth: int, time_limit: Optional[float],
+              hash_mb: float) -> None:
+    """Search one position with each worker count and print speed and scaling."""
+    position = Position.from_fen(fen)
+    base_nps_per_worker = None
+    base_seconds = None
+    print(f"{'workers':>7} {'depth':>5} {'time':>8} {'nodes':>10} {'nps':>10} "
+          f"{'nps/worker':>10} {'efficiency':>10} {'speedup':>7}  best")
+    for workers in worker_counts:
+        searcher = ParallelSearcher(workers, hash_mb)
+        try:
+            result = searcher.search(position, depth, time_limit)
+        finally:
+            searcher.close()
+        per_worker = result.nps / workers
+        if base_nps_per_worker is None:
+            base_nps_per_worker, base_seconds = per_worker, result.seconds
+        # Efficiency: how much of one worker's speed each worker keeps;
+        # speedup: time to the same depth against the first worker count
+        efficiency = per_worker / base_nps_per_worker if base_nps_per_worker else 0
+        speedup = base_seconds / result.seconds if result.seconds and time_limit is None else 0
+        print(f"{workers:>7} {result.depth:>5} {result.seconds:>8.3f} {result.nodes:>10} "
+              f"{result.nps:>10,.0f} {per_worker:>10,.0f} {efficiency:>10.0%} "
+              f"{speedup:>7.2f}  {to_uci(result.move)} {format_score(result.score)}")
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Lazy SMP search scaling across worker counts.")
+    parser.add_argument("--fen", default=STARTING_FEN, help="position to search (default: start)")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, os.cpu_count() or 1],
+                        help="worker counts to compare")
+    parser.add_argument("--depth", type=int, default=6)
+    parser.add_argument("--time", type=float, default=None,
+                        help="fixed time per run instead of a fixed depth")
+    parser.add_argument("--hash", type=float, default=64, help="shared table size in MB")
+    args = parser.parse_args(argv)
+
+    depth = args.depth if args.time is None else MAX_PLY - 1
+    benchmark(args.fen, args.workers, depth, args.time, args.hash)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
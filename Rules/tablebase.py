@@ -0,0 +1,575 @@
+"""Endgame tablebases: distance-to-mate tables generated by retrograde analysis.
+
+A table covers one material set such as KQK or KBNK (stronger side first)
+and stores one byte per position: 0 for a draw, otherwise the number of
+plies to mate with best play plus one. An odd ply count is a win for the
+side to move, an even one a loss. Tables are probed in place through mmap.
+
+Positions are indexed by an anchor piece on a reduced set of squares: the
+stronger king on the a1-d1-d4 triangle for pawnless sets (every position
+has a mirror image there), or the first pawn on files a-d. The other
+pieces each add a factor of 64, and the side to move a factor of two.
+
+Generation uses the rules core's own move generator. A scan pass finds
+mates and the moves that leave the table (captures and promotions, looked
+up in smaller tables). Then the positions solved at each distance are
+unmoved to find their predecessors: a predecessor of a loss is a win, and
+a predecessor of a win is a loss once every one of its moves is verified
+to lose. Both passes run on a process pool around a table kept in shared
+memory.
+
+Usage:
+    python -m Rules.tablebase generate KQK KRK KPK KBNK --dir tablebases --workers 4
+    python -m Rules.tablebase probe --dir tablebases --fen "<fen>"
+"""
+
+import argparse
+import mmap
+import os
+import time
+from multiprocessing import Pool
+from multiprocessing.shared_memory import SharedMemory
+from typing import Dict, Iterator, List, NamedTuple, Optional, Sequence, Tuple
+
+from Rules.bitboard import (
+    WHITE, BLACK, PAWN, KING, PIECE_SYMBOLS,
+    KNIGHT_ATTACKS, KING_ATTACKS, bishop_attacks, rook_attacks, queen_attacks,
+    iter_bits, popcount,
+)
+from Rules.evaluate import PIECE_VALUES
+from Rules.move import CAPTURE, PROMOTION, to_uci
+from Rules.position import Position
+
+
+EXTENSION = ".pctb"
+# File header: magic, format version, material name padded with spaces
+MAGIC = b"PCTB"
+VERSION = 1
+HEADER_SIZE = 16
+
+WIN, DRAW, LOSS = 1, 0, -1
+# Piece letters in the order they appear in material names
+ORDER = "QRBNP"
+# No mate is possible at all, so these need no table
+INSUFFICIENT = ("KK", "KBK", "KNK")
+
+# Anchor squares: the a1-d1-d4 triangle, or pawn squares on files a-d
+KING_ANCHORS = [sq for sq in range(64) if (sq >> 3) <= (sq & 7) <= 3]
+PAWN_ANCHORS = [sq for sq in range(8, 56) if sq & 7 <= 3]
+TRANSPOSE = [(sq & 7) << 3 | sq >> 3 for sq in range(64)]
+
+
+class Probe(NamedTuple):
+    result: int  # WIN, DRAW or LOSS for the side to move
+    plies: int  # to mate with best play; 0 for a draw
+
+    def __str__(self) -> str:
+        moves = (self.plies + 1) // 2
+        if self.result == WIN:
+            return f"mate in {moves}"
+        if self.result == LOSS:
+            return f"mated in {moves}" if moves else "checkmated"
+        return "draw"
+
+
+def _to_probe(value: int) -> Probe:
+    if not value:
+        return Probe(DRAW, 0)
+    plies = value - 1
+    return Probe(WIN if plies & 1 else LOSS, plies)
+
+
+def _after_move(child: Probe) -> Probe:
+    """The result of a move, given the probe of the position it leads to."""
+    return Probe(-child.result, child.plies + 1 if child.result != DRAW else 0)
+
+
+# ==== Material ====
+
+def _strength(pieces: str) -> Tuple:
+    return tuple(PIECE_VALUES[PIECE_SYMBOLS.index(letter.lower())] for letter in pieces), pieces
+
+
+def material_name(white: str, black: str) -> Tuple[str, bool]:
+    """Table name for the given non-king pieces, and whether black is the stronger side."""
+    white = "".join(sorted(white, key=ORDER.index))
+    black = "".join(sorted(black, key=ORDER.index))
+    if _strength(black) > _strength(white):
+        return f"K{black}K{white}", True
+    return f"K{white}K{black}", False
+
+
+def position_material(position: Position) -> Tuple[str, bool]:
+    """material_name() of a position."""
+    sides = []
+    for color in (WHITE, BLACK):
+        bbs = position.bitboards[color]
+        sides.append("".join(letter * popcount(bbs[PIECE_SYMBOLS.index(letter.lower())])
+                             for letter in ORDER))
+    return material_name(*sides)
+
+
+def split_material(material: str) -> Tuple[str, str]:
+    """("Q", "") for "KQK"; ValueError unless the name is in canonical form."""
+    material = material.upper()
+    if material.count("K") != 2 or not material.startswith("K"):
+        raise ValueError(f"Invalid material {material!r}, expected e.g. KQK or KBNK")
+    strong, weak = material[1:].split("K")
+    if any(letter not in ORDER for letter in strong + weak):
+        raise ValueError(f"Invalid material {material!r}")
+    if material_name(strong, weak) != (material, False):
+        raise ValueError(f"Write {material!r} as {material_name(strong, weak)[0]}")
+    if len(set(strong)) != len(strong) or len(set(weak)) != len(weak):
+        raise ValueError(f"Repeated pieces are not supported: {material!r}")
+    return strong, weak
+
+
+def dependencies(material: str) -> List[str]:
+    """Tables a capture or promotion from `material` can lead to."""
+    strong, weak = split_material(material)
+    names = set()
+    for i in range(len(strong)):
+        names.add(material_name(strong[:i] + strong[i + 1:], weak)[0])
+    for i in range(len(weak)):
+        names.add(material_name(strong, weak[:i] + weak[i + 1:])[0])
+    for pieces, other, white in ((strong, weak, True), (weak, strong, False)):
+        for i, letter in enumerate(pieces):
+            if letter == "P":
+                for promoted in "QRBN":
+                    mine = pieces[:i] + promoted + pieces[i + 1:]
+                    names.add(material_name(mine, other)[0] if white else material_name(other, mine)[0])
+    return sorted(name for name in names if name not in INSUFFICIENT)
+
+
+# ==== Indexing ====
+
+class Layout:
+    """Maps the positions of one material set to table indices and back."""
+
+    def __init__(self, material: str) -> None:
+        strong, weak = split_material(material)
+        self.material = material.upper()
+        # (color, type) of each piece, in index order; the stronger side plays white
+        self.pieces: List[Tuple[int, int]] = (
+            [(WHITE, KING), (BLACK, KING)]
+            + [(WHITE, PIECE_SYMBOLS.index(letter.lower())) for letter in strong]
+            + [(BLACK, PIECE_SYMBOLS.index(letter.lower())) for letter in weak])
+        pawns = [i for i, (_, ptype) in enumerate(self.pieces) if ptype == PAWN]
+        self.has_pawns = bool(pawns)
+        self.anchor = pawns[0] if pawns else 0
+        self.anchors = PAWN_ANCHORS if pawns else KING_ANCHORS
+        self.anchor_slot = [-1] * 64
+        for slot, sq in enumerate(self.anchors):
+            self.anchor_slot[sq] = slot
+        self.others = [i for i in range(len(self.pieces)) if i != self.anchor]
+        self.size = 2 * len(self.anchors) * 64 ** len(self.others)
+
+    def canonical(self, squares: List[int]) -> List[int]:
+        """The mirror image of `squares` that has an index."""
+        anchor = squares[self.anchor]
+        if anchor & 7 > 3:
+            squares = [sq ^ 7 for sq in squares]
+            anchor ^= 7
+        if self.has_pawns:
+            return squares
+        if anchor >> 3 > 3:
+            squares = [sq ^ 56 for sq in squares]
+            anchor ^= 56
+        if anchor >> 3 > anchor & 7:
+            squares = [TRANSPOSE[sq] for sq in squares]
+        elif anchor >> 3 == anchor & 7:
+            # On the diagonal both the position and its transpose fit the
+            # triangle; keep whichever sorts first so each has one index
+            transposed = [TRANSPOSE[sq] for sq in squares]
+            if transposed < squares:
+                squares = transposed
+        return squares
+
+    def index(self, squares: Sequence[int], side: int) -> int:
+        """Index of canonical `squares` (one per piece, in self.pieces order)."""
+        index = side * len(self.anchors) + self.anchor_slot[squares[self.anchor]]
+        for i in self.others:
+            index = index * 64 + squares[i]
+        return index
+
+    def decode(self, index: int) -> Tuple[List[int], int]:
+        squares = [0] * len(self.pieces)
+        for i in reversed(self.others):
+            index, squares[i] = divmod(index, 64)
+        side, slot = divmod(index, len(self.anchors))
+        squares[self.anchor] = self.anchors[slot]
+        return squares, side
+
+    def squares_of(self, position: Position, flipped: bool) -> Tuple[List[int], int]:
+        """Canonical squares and side to move of `position`, with colours swapped if `flipped`."""
+        bbs = position.bitboards
+        if flipped:
+            squares = [(bbs[color ^ 1][ptype].bit_length() - 1) ^ 56 for color, ptype in self.pieces]
+            return self.canonical(squares), position.side ^ 1
+        squares = [bbs[color][ptype].bit_length() - 1 for color, ptype in self.pieces]
+        return self.canonical(squares), position.side
+
+    def position(self, squares: Sequence[int], side: int) -> Optional[Position]:
+        """The position at `squares`, or None if it is not a legal, canonical one."""
+        if len(set(squares)) != len(squares) or self.canonical(list(squares)) != list(squares):
+            return None
+        position = Position()
+        for sq, (color, ptype) in zip(squares, self.pieces):
+            if ptype == PAWN and not 8 <= sq < 56:
+                return None
+            position._put(sq, color, ptype)
+        position.side = side
+        if side == BLACK:
+            position.key = position.compute_key()
+        if position.attackers_to(position.king_square(side ^ 1), side):
+            return None  # the side that just moved left its king in check
+        return position
+
+
+# ==== Probing ====
+
+class Table:
+    """One material set's table, memory-mapped."""
+
+    def __init__(self, path: str) -> None:
+        self.file = open(path, "rb")
+        self.data = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        if self.data[:4] != MAGIC or self.data[4] != VERSION:
+            self.close()
+            raise ValueError(f"Not a tablebase file: {path}")
+        self.layout = Layout(self.data[5:HEADER_SIZE].decode("ascii").strip())
+        if len(self.data) != HEADER_SIZE + self.layout.size:
+            self.close()
+            raise ValueError(f"Truncated tablebase file: {path}")
+
+    def close(self) -> None:
+        self.data.close()
+        self.file.close()
+
+    def value(self, position: Position, flipped: bool) -> int:
+        squares, side = self.layout.squares_of(position, flipped)
+        return self.data[HEADER_SIZE + self.layout.index(squares, side)]
+
+
+class Tablebases:
+    """Every table in a directory. Mapping a table reads nothing, so all are mapped up front
+    and probes from several threads need no locking."""
+
+    def __init__(self, directory: str) -> None:
+        self.directory = directory
+        self.tables: Dict[str, Table] = {}
+        if os.path.isdir(directory):
+            for name in sorted(os.listdir(directory)):
+                if name.endswith(EXTENSION):
+                    table = Table(os.path.join(directory, name))
+                    self.tables[table.layout.material] = table
+        # position_material() by piece counts packed into an int
+        self.materials: Dict[int, Tuple[str, bool]] = {}
+        # Pieces on the board in the largest table, kings included
+        self.max_pieces = max((len(name) for name in self.tables), default=2)
+
+    def __contains__(self, material: str) -> bool:
+        return material in self.tables
+
+    def close(self) -> None:
+        for table in self.tables.values():
+            table.close()
+        self.tables.clear()
+
+    def probe(self, position: Position) -> Optional[Probe]:
+        """Result and distance to mate of `position`, or None if no table covers it."""
+        if position.castling or popcount(position.occupancy[WHITE] | position.occupancy[BLACK]) > self.max_pieces:
+            return None
+        white, black = position.bitboards
+        counts = 0
+        for ptype in range(5):
+            counts = counts << 8 | popcount(white[ptype]) << 4 | popcount(black[ptype])
+        entry = self.materials.get(counts)
+        if entry is None:
+            entry = self.materials[counts] = position_material(position)
+        material, flipped = entry
+        if material in INSUFFICIENT:
+            return Probe(DRAW, 0)
+        table = self.tables.get(material)
+        if table is None:
+            return None
+        return _to_probe(table.value(position, flipped))
+
+    def root_moves(self, position: Position) -> Optional[List[Tuple[int, Probe]]]:
+        """Every legal move with its result, best first; None if a table is missing.
+
+        Wins come first, fastest mate first; losses last, longest defence first.
+        """
+        scored = []
+        for move in position.legal_moves():
+            undo = position.make_move(move)
+            child = self.probe(position)
+            position.unmake_move(undo)
+            if child is None:
+                return None
+            scored.append((move, _after_move(child)))
+        scored.sort(key=lambda entry: (-entry[1].result, entry[1].plies * entry[1].result))
+        return scored
+
+
+# ==== Generation ====
+
+# Per-process generation state, set up once by _init_worker
+_layout: Optional[Layout] = None
+_values: Optional[memoryview] = None
+_tables: Optional[Tablebases] = None
+_memory: Optional[SharedMemory] = None
+
+
+def _init_worker(material: str, name: str, directory: str) -> None:
+    global _layout, _values, _tables, _memory
+    _layout = Layout(material)
+    _memory = SharedMemory(name=name)
+    _values = _memory.buf
+    _tables = Tablebases(directory)
+
+
+def _child_value(position: Position, move: int) -> int:
+    """Table value of the position after `move`, found in a smaller table if it leaves this one."""
+    undo = position.make_move(move)
+    if move >> 12 & (CAPTURE | PROMOTION):
+        probe = _tables.probe(position)
+        position.unmake_move(undo)
+        if probe is None:
+            raise RuntimeError(f"Missing table for a position reached from {_layout.material}")
+        return probe.plies + 1 if probe.result != DRAW else 0
+    value = _values[_layout.index(*_layout.squares_of(position, False))]
+    position.unmake_move(undo)
+    return value
+
+
+def _scan(bounds: Tuple[int, int]) -> List[Tuple[int, int]]:
+    """(index, value) of the positions in a range that are solved without looking inside the table:
+    checkmates, and positions whose best move (or every move) leaves the table."""
+    solved = []
+    for index in range(*bounds):
+        position = _layout.position(*_layout.decode(index))
+        if position is None:
+            continue
+        moves = position.legal_moves()
+        if not moves:
+            if position.in_check():
+                solved.append((index, 1))
+            continue
+        fastest_win = 0
+        longest_loss = 0
+        inside = False
+        for move in moves:
+            if not move >> 12 & (CAPTURE | PROMOTION):
+                inside = True
+                continue
+            value = _child_value(position, move)
+            if not value:
+                longest_loss = -1
+            elif value & 1:  # the opponent is mated in value - 1 plies
+                fastest_win = min(fastest_win or value + 1, value + 1)
+            elif longest_loss >= 0:
+                longest_loss = max(longest_loss, value + 1)
+        if fastest_win:
+            solved.append((index, fastest_win))
+        elif not inside and longest_loss > 0:
+            solved.append((index, longest_loss))
+    return solved
+
+
+def _unmoves(position: Position, squares: List[int]) -> Iterator[List[int]]:
+    """Squares of every position that reaches `position` by a move within the table."""
+    side = position.side
+    mover = side ^ 1
+    occupied = position.occupancy[WHITE] | position.occupancy[BLACK]
+    for i, (color, ptype) in enumerate(_layout.pieces):
+        if color != mover:
+            continue
+        sq = squares[i]
+        if ptype == PAWN:
+            step = 8 if color == WHITE else -8
+            origins = 0
+            single = sq - step
+            if 8 <= single < 56 and not occupied >> single & 1:
+                origins = 1 << single
+                double = single - step
+                if (sq >> 3) == (3 if color == WHITE else 4) and not occupied >> double & 1:
+                    origins |= 1 << double
+        elif ptype == KING:
+            origins = KING_ATTACKS[sq] & ~occupied
+        elif ptype == 1:
+            origins = KNIGHT_ATTACKS[sq] & ~occupied
+        elif ptype == 2:
+            origins = bishop_attacks(sq, occupied) & ~occupied
+        elif ptype == 3:
+            origins = rook_attacks(sq, occupied) & ~occupied
+        else:
+            origins = queen_attacks(sq, occupied) & ~occupied
+        for origin in iter_bits(origins):
+            position._remove(sq)
+            position._put(origin, color, ptype)
+            # Before the move it was the mover's turn, so the other king cannot be in check
+            legal = not position.attackers_to(position.king_square(side), mover)
+            position._remove(origin)
+            position._put(sq, color, ptype)
+            if legal:
+                before = squares[:]
+                before[i] = origin
+                yield before
+
+
+def _loss_value(position: Position) -> int:
+    """Table value of `position` if every move leads to a position already won
+    for the opponent, else 0."""
+    longest = 0
+    for move in position.legal_moves():
+        value = _child_value(position, move)
+        if not value or value & 1:
+            return 0
+        longest = max(longest, value)
+    return longest + 1
+
+
+def _retrograde(job: Tuple[int, List[int]]) -> List[Tuple[int, int]]:
+    """(index, value) of positions solved by a move into the positions solved at `plies`.
+
+    Wins are solved at `plies + 1`; a loss may be longer when its longest
+    defence leaves the table.
+    """
+    plies, indices = job
+    solved = []
+    seen = set()
+    for index in indices:
+        squares, side = _layout.decode(index)
+        position = _layout.position(squares, side)
+        for before in _unmoves(position, squares):
+            before = _layout.canonical(before)
+            previous = _layout.index(before, side ^ 1)
+            if previous in seen or _values[previous]:
+                continue
+            seen.add(previous)
+            if plies & 1 == 0:
+                # Every predecessor of a loss wins by moving into it
+                solved.append((previous, plies + 2))
+            else:
+                value = _loss_value(_layout.position(before, side ^ 1))
+                if value:
+                    solved.append((previous, value))
+    return solved
+
+
+def _chunks(items: Sequence[int], size: int) -> Iterator[Sequence[int]]:
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def table_path(directory: str, material: str) -> str:
+    return os.path.join(directory, material.upper() + EXTENSION)
+
+
+def generate(material: str, directory: str, workers: int = os.cpu_count() or 1,
+             verbose: bool = True) -> str:
+    """Write the table for `material` into `directory`, first generating any smaller
+    table it depends on. Returns the table's path."""
+    material = material.upper()
+    split_material(material)
+    os.makedirs(directory, exist_ok=True)
+    for dependency in dependencies(material):
+        if not os.path.exists(table_path(directory, dependency)):
+            generate(dependency, directory, workers, verbose)
+
+    start = time.perf_counter()
+    layout = Layout(material)
+    memory = SharedMemory(create=True, size=layout.size)
+    values = memory.buf[:layout.size]
+    values[:] = bytes(layout.size)
+    try:
+        with Pool(max(1, workers), initializer=_init_worker,
+                  initargs=(material, memory.name, directory)) as pool:
+            # Scan: mates, and positions decided by leaving the table
+            pending: Dict[int, List[int]] = {}
+            bounds = [(low, min(low + 4096, layout.size)) for low in range(0, layout.size, 4096)]
+            for solved in pool.imap_unordered(_scan, bounds):
+                for index, value in solved:
+                    pending.setdefault(value - 1, []).append(index)
+            if verbose:
+                print(f"{material}: scanned {layout.size} entries in {time.perf_counter() - start:.1f}s")
+
+            # Retrograde passes, one distance at a time
+            plies = 0
+            frontier: List[int] = []
+            while frontier or pending:
+                for index in pending.pop(plies, []):
+                    if not values[index]:
+                        values[index] = plies + 1
+                        frontier.append(index)
+                if verbose and frontier:
+                    print(f"{material}: {len(frontier)} positions {_to_probe(plies + 1)}, "
+                          f"{time.perf_counter() - start:.1f}s")
+                jobs = [(plies, chunk) for chunk in _chunks(frontier, 1024)]
+                frontier = []
+                for solved in pool.imap_unordered(_retrograde, jobs):
+                    for index, value in solved:
+                        if value != plies + 2:
+                            pending.setdefault(value - 1, []).append(index)
+                        elif not values[index]:
+                            values[index] = value
+                            frontier.append(index)
+                plies += 1
+                if plies > 254:
+                    raise RuntimeError(f"{material}: distance to mate does not fit in a byte")
+
+        path = table_path(directory, material)
+        with open(path, "wb") as f:
+            f.write(MAGIC + bytes([VERSION]) + material.ljust(HEADER_SIZE - 5).encode("ascii"))
+            f.write(values)
+        if verbose:
+            wins = sum(1 for value in values if value and not value & 1)
+            losses = sum(1 for value in values if value and value & 1)
+            longest = max(values)
+            print(f"{material}: {layout.size} entries, {wins} wins, {losses} losses, "
+                  f"longest mate {longest // 2} moves, {time.perf_counter() - start:.1f}s")
+        return path
+    finally:
+        values.release()
+        memory.close()
+        memory.unlink()
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Generate and probe endgame tablebases.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    build = commands.add_parser("generate", help="generate tables (and the smaller ones they need)")
+    build.add_argument("materials", nargs="+", help="material sets, e.g. KQK KRK KPK KBNK")
+    build.add_argument("--dir", default="tablebases")
+    build.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    lookup = commands.add_parser("probe", help="show the result and best moves of a position")
+    lookup.add_argument("--fen", required=True)
+    lookup.add_argument("--dir", default="tablebases")
+    args = parser.parse_args(argv)
+
+    if args.command == "generate":
+        for material in args.materials:
+            generate(material, args.dir, args.workers)
+        return 0
+
+    tablebases = Tablebases(args.dir)
+    position = Position.from_fen(args.fen)
+    probe = tablebases.probe(position)
+    if probe is None:
+        print("Not in the tablebases")
+        return 1
+    runs = 10000
+    start = time.perf_counter()
+    for _ in range(runs):
+        tablebases.probe(position)
+    micros = (time.perf_counter() - start) / runs * 1e6
+    print(f"{probe} ({micros:.1f}us per probe)")
+    for move, result in tablebases.root_moves(position) or []:
+        print(f"{to_uci(move):<6} {result}")
+    tablebases.close()
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,116 @@
+"""Fixed-size transposition table in a flat array of 64-bit words.
+
+Each bucket holds two slots: a depth-preferred one that keeps the deepest
+recent entry and an always-replace one that takes everything else. A slot
+is two words: the Zobrist key XOR the data word, then the data word; an
+entry only matches when the two XOR back to the probed key, so a slot
+torn by a concurrent writer reads as a miss instead of a wrong entry.
+"""
+
+from array import array
+from typing import Optional, Tuple
+
+from Rules.move import NULL_MOVE
+
+
+# Bound types; 0 marks an empty slot
+BOUND_NONE, BOUND_LOWER, BOUND_UPPER, BOUND_EXACT = range(4)
+
+# Data word layout: move 16 bits | score + 32768 16 bits | depth 8 bits | bound 2 bits | age 6 bits
+_SCORE_SHIFT, _DEPTH_SHIFT, _BOUND_SHIFT, _AGE_SHIFT = 16, 32, 40, 42
+_AGE_MASK = 63
+_BYTES_PER_BUCKET = 32  # two slots of two 8-byte words
+
+# probe() result: (best move, score, depth, bound)
+Entry = Tuple[int, int, int, int]
+
+
+def table_bytes(size_mb: float) -> int:
+    """Bytes used by a table capped at `size_mb`: a power-of-two number of buckets."""
+    buckets = 1
+    while buckets * 2 * _BYTES_PER_BUCKET <= size_mb * 1024 * 1024:
+        buckets *= 2
+    return buckets * _BYTES_PER_BUCKET
+
+
+class TranspositionTable:
+    def __init__(self, size_mb: float = 16, buffer: Optional[memoryview] = None) -> None:
+        """A table of at most `size_mb`, in its own array or laid over `buffer`.
+
+        `buffer` lets several processes share one table, e.g. the .buf of a
+        multiprocessing.shared_memory block of table_bytes(size_mb) bytes.
+        """
+        size = table_bytes(size_mb)
+        if buffer is None:
+            self.table = array("Q", bytes(size))
+        else:
+            self.table = memoryview(buffer)[:size].cast("Q")
+        # A power-of-two bucket count lets the key pick a bucket with a mask
+        self.mask = size // _BYTES_PER_BUCKET - 1
+        self.age = 0
+        self.hits = 0
+        self.misses = 0
+        # misses where the bucket held other positions
+        self.collisions = 0
+
+    @property
+    def size_bytes(self) -> int:
+        return len(self.table) * 8
+
+    def clear(self) -> None:
+        self.table[:] = array("Q", bytes(self.size_bytes))
+        self.age = 0
+        self.reset_stats()
+
+    def reset_stats(self) -> None:
+        self.hits = self.misses = self.collisions = 0
+
+    def new_search(self) -> None:
+        """Age the table so entries from earlier moves are replaced first."""
+        self.age = (self.age + 1) & _AGE_MASK
+
+    def probe(self, key: int) -> Optional[Entry]:
+        table = self.table
+        index = (key & self.mask) << 2
+        for slot in (index, index + 2):
+            data = table[slot + 1]
+            if table[slot] ^ data == key and data:
+                self.hits += 1
+                return (data & 0xFFFF, ((data >> _SCORE_SHIFT) & 0xFFFF) - 32768,
+                        (data >> _DEPTH_SHIFT) & 0xFF, (data >> _BOUND_SHIFT) & 3)
+        self.misses += 1
+        if table[index + 1] or table[index + 3]:
+            self.collisions += 1
+        return None
+
+    def store(self, key: int, move: int, score: int, depth: int, bound: int) -> None:
+        table = self.table
+        index = (key & self.mask) << 2
+        slot = index + 2
+        data = table[index + 1]
+        if table[index] ^ data == key or not data or depth >= (data >> _DEPTH_SHIFT) & 0xFF \
+                or (data >> _AGE_SHIFT) & _AGE_MASK != self.age:
+            # Same position, empty, shallower or left over from an earlier move
+            slot = index
+        else:
+            data = table[slot + 1]
+        if move == NULL_MOVE and table[slot] ^ data == key:
+            # Keep the best move found by an earlier search of this position
+            move = data & 0xFFFF
+        data = (move | (score + 32768) << _SCORE_SHIFT | max(depth, 0) << _DEPTH_SHIFT
+                | bound << _BOUND_SHIFT | self.age << _AGE_SHIFT)
+        table[slot] = key ^ data
+        table[slot + 1] = data
+
+    def hashfull(self) -> int:
+        """Permille of sampled slots holding an entry from the current search."""
+        sample = min(1000, len(self.table) // 2)
+        used = sum(1 for i in range(sample)
+                   if self.table[2 * i + 1] and (self.table[2 * i + 1] >> _AGE_SHIFT) & _AGE_MASK == self.age)
+        return used * 1000 // sample
+
+    def stats(self) -> str:
+        probes = self.hits + self.misses
+        return (f"hash {self.size_bytes // (1024 * 1024)}MB hits {self.hits} misses {self.misses} "
+                f"collisions {self.collisions} hit rate {self.hits / probes if probes else 0:.1%} "
+                f"full {self.hashfull()}permille")
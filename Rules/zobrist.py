@@ -0,0 +1,21 @@
+"""Zobrist keys: 64-bit random numbers XORed together to identify a position."""
+
+import random
+
+
+# Fixed seed so every process (and every run) agrees on the same keys
+_rng = random.Random(0x5EED_C4E55)
+
+# PIECE_KEYS[color * 6 + piece_type][square]
+PIECE_KEYS = [[_rng.getrandbits(64) for _ in range(64)] for _ in range(12)]
+SIDE_KEY = _rng.getrandbits(64)
+# One key per castling-rights bitmask, so a rights change is a single XOR
+_CASTLING_BITS = [_rng.getrandbits(64) for _ in range(4)]
+CASTLING_KEYS = [0] * 16
+for _rights in range(16):
+    for _bit in range(4):
+        if _rights >> _bit & 1:
+            CASTLING_KEYS[_rights] ^= _CASTLING_BITS[_bit]
+EP_FILE_KEYS = [_rng.getrandbits(64) for _ in range(8)]
+
+del _rng, _rights, _bit
@@ -1,8 +1,17 @@
+import os
 import pygame
-from player import Player
+from player import ComputerPlayer, Player
 from board import Board
+from assets import get_image
+from Rules.bitboard import WHITE, from_coords
+from Rules.polyglot import OpeningBook
+from Rules.position import Position
+from Rules.san import move_to_san
+from Rules.see import hanging_pieces
+from Rules.tablebase import Tablebases
+from Scenes.scene import Scene
 from UI.panel import Panel
-from typing import TYPE_CHECKING
+from typing import TYPE_CHECKING, Dict, List, Optional, Tuple
 if TYPE_CHECKING:
     from main import Game
 
@@ -52,44 +61,117 @@ def make_coming_soon_panel(x: int, y: int,
 
 
 
-class GameScene:
+# Book moves listed by the opening explorer
+EXPLORER_MOVES = 4
+
+
+# What a board square shows: (piece id, selected, in check, move hint, hanging)
+SquareState = Tuple[Optional[str], bool, bool, bool, bool]
+
+
+class GameScene(Scene):
     def __init__(self, game: "Game"):
+        super().__init__(game)
 
-        self.game = game
         self.settings = game.settings
         self.name = "Playing"
 
         # Core game state
-        self.board = Board(self.settings)
-        self._set_players()
+        self.board = Board(self.settings, self.settings.start_fen)
+        # Shared by the side panel and any computer player
+        self.book = self._open_book()
+        self.tablebases = (Tablebases(self.settings.tablebase_dir)
+                           if os.path.isdir(self.settings.tablebase_dir) else None)
+        # Set before the players: a computer moving first checks it in start_turn
         self.is_game_over = False
-        self.next_moves_surface: None | pygame.Surface = None
-        self.next_move_icon = pygame.image.load(self.settings.next_move_icon)
+        self._set_players()
+        # Legal targets of the selected piece (its valid_moves dict), drawn as hints
+        self.move_hints: Optional[Dict[Tuple[int, int], int]] = None
+        self.next_move_icon = get_image(
+            self.settings.next_move_icon, (self.settings.squarewidth, self.settings.squareheight))
         self.hovering = False
         self.coming_soon_panel = make_coming_soon_panel(
             x=self.settings.BOARD_WIDTH, y=0, panel_w=self.settings.BOARD_WIDTH, panel_h=self.settings.BOARD_HEIGHT)
+        self.explorer_label = self.coming_soon_panel.add_component(
+            "Label",
+            text="",
+            font_size=16,
+            pos=(self.settings.BOARD_WIDTH // 2, 80),
+            color=(170, 200, 255),
+        )
+        self.hint_label = self.coming_soon_panel.add_component(
+            "Label",
+            text="",
+            font_size=16,
+            pos=(self.settings.BOARD_WIDTH // 2, 225),
+            color=(150, 230, 150),
+        )
+        # Position the explorer and hint were last updated for
+        self._panel_key: Optional[int] = None
+
+        # Dirty-rectangle rendering: what each square showed when last drawn
+        self.drawn_squares: Dict[Tuple[int, int], SquareState] = {}
+        self.full_redraw = True
+        # Hanging pieces of the side to move, recomputed only when the position changes
+        self._hanging_key: Optional[int] = None
+        self._hanging = 0
 
-    def restart(self):
+    def restart(self, fen: Optional[str] = None):
+        """Start a new game from the start position, or from `fen` from now on.
+
+        Raises ValueError for an invalid FEN, before anything is torn down.
+        """
+        if fen is not None:
+            Position.from_fen(fen)
+        for player in self.players:
+            player.revoke_turn()
+            player.close()
         self.white.pieces.clear()
         self.black.pieces.clear()
-        self.board.clear()
+        self.board.clear(fen)
         self._set_players()
         self.is_game_over = False
-        self.next_moves_surface: None | pygame.Surface = None
+        self.move_hints = None
         self.hovering = False
+        self.full_redraw = True
+
+    def close(self):
+        """Stop the computer players' searches before the game exits."""
+        for player in self.players:
+            player.close()
+        if self.book is not None:
+            self.book.close()
+            self.book = None
+        if self.tablebases is not None:
+            self.tablebases.close()
+            self.tablebases = None
+
+    def on_enter(self):
+        # The screen was cleared by the scene switch, so repaint everything
+        self.full_redraw = True
 
     @property
     def screen(self):
         return self.game.screen
 
+    def _open_book(self) -> Optional[OpeningBook]:
+        path = self.settings.opening_book
+        if not path or not os.path.isfile(path):
+            return None
+        return OpeningBook(path)
+
+    def _make_player(self, color: str) -> Player:
+        if color in self.settings.computer_colors:
+            return ComputerPlayer(self, color)
+        return Player(self, color)
+
     def _set_players(self):
-        self.white = Player(self, "white")
+        self.white = self._make_player("white")
 
-        self.black = Player(self, "black")
+        self.black = self._make_player("black")
         self.players = [self.white, self.black]
-        for piece in self.board.get_all_pieces():
-            piece.has_moved = False
-        self.current_player = 0
+        # Index 0 is white, as is WHITE
+        self.current_player = self.board.position.side
         self.players[self.current_player].start_turn(self.get_next_player())
 
     def get_current_player(self) -> Player:
@@ -98,6 +180,9 @@ class GameScene:
     def get_next_player(self) -> Player:
         return self.players[(self.current_player + 1) % 2]
 
+    def get_player(self, color: str) -> Player:
+        return self.white if color == "white" else self.black
+
     def _toggle_player(self):
         self.current_player = (self.current_player + 1) % 2
 
@@ -110,7 +195,27 @@ class GameScene:
         self.get_current_player().turn_complete = False
         self._toggle_player()
         self.get_current_player().start_turn(self.get_next_player())
-        self.next_moves_surface = None
+        self.move_hints = None
+        self.get_next_player().revoke_turn()
+
+    def takeback(self):
+        """Undo the last move and hand the turn back to the player who made it.
+
+        Against the computer its reply is undone as well, so the human moves again.
+        """
+        if not self.board.undo_stack:
+            return
+        player = self.get_current_player()
+        player.revoke_turn()
+        player.selected = False
+        player.selected_piece = ""
+        self.is_game_over = False
+        while self.board.takeback(self):
+            self._toggle_player()
+            if not self.get_current_player().is_computer or self.get_next_player().is_computer:
+                break
+        self.get_current_player().start_turn(self.get_next_player())
+        self.move_hints = None
         self.get_next_player().revoke_turn()
 
     # ==== Scene API ====
@@ -121,6 +226,8 @@ class GameScene:
         if event.type == pygame.KEYDOWN:
             if event.key == pygame.K_ESCAPE:
                 self.game.pause()
+            elif event.key == pygame.K_BACKSPACE:
+                self.takeback()
 
         hovering = self.get_current_player().selected
         if self.hovering != hovering:
@@ -129,23 +236,126 @@ class GameScene:
             self.hovering = hovering
 
     def update(self, dt: float):
+        self.get_current_player().update()
         if self.get_current_player().turn_complete:
             self.change_turn()
+        self._update_panel()
 
-    def draw(self, surface: pygame.Surface):
-        # draw board
-        self.board.render_board(
-            surface,
-            (self.settings.squarewidth, self.settings.squareheight),
-            self.settings.tiles,
-        )
+    def is_busy(self) -> bool:
+        # Keep frames coming until the computer's move has been played
+        return self.get_current_player().is_thinking()
+
+    def _update_panel(self) -> None:
+        """Refresh the opening explorer and endgame hint, once per position."""
+        position = self.board.position
+        if self._panel_key == position.key:
+            return
+        self._panel_key = position.key
+        self.explorer_label.set_text(self._explorer_text(position))
+        self.hint_label.set_text(self._endgame_hint(position))
+
+    def _explorer_text(self, position) -> str:
+        """The book moves for `position` with their share of the games."""
+        if self.book is None:
+            return "No opening book"
+        entries = self.book.entries(position)
+        if not entries:
+            return "Out of book"
+        total = sum(weight for _, weight in entries) or 1
+        moves = position.legal_moves()
+        lines = ["Book moves"] + [f"{move_to_san(position, move, moves)}  {weight / total:.0%}"
+                                  for move, weight in entries[:EXPLORER_MOVES]]
+        return "/b/".join(lines)
+
+    def _endgame_hint(self, position) -> str:
+        """The tablebase result and best move, or nothing outside the tables."""
+        if self.tablebases is None or not self.settings.show_endgame_hints \
+                or self.tablebases.probe(position) is None:
+            return ""
+        solved = self.tablebases.root_moves(position)
+        if not solved:
+            return ""
+        move, probe = solved[0]
+        side = "White" if position.side == WHITE else "Black"
+        return f"Tablebase: {side} to move, {probe} ({move_to_san(position, move)})"
+
+    def _hanging_pieces(self) -> int:
+        """Side-to-move pieces the opponent wins material by capturing (SEE > 0)."""
+        if not self.settings.show_hanging_pieces:
+            return 0
+        position = self.board.position
+        if self._hanging_key != position.key:
+            self._hanging_key = position.key
+            self._hanging = hanging_pieces(position, position.side)
+        return self._hanging
+
+    def _square_states(self) -> Dict[Tuple[int, int], SquareState]:
+        hints = self.move_hints or ()
+        hanging = self._hanging_pieces()
+
+        states = {}
+        for rank, row in enumerate(self.board.board):
+            for file, piece_id in enumerate(row):
+                selected = checked = is_hanging = False
+                if piece_id is not None:
+                    piece = self.board.get_piece(piece_id)
+                    selected = piece.selected
+                    checked = piece.type == "king" and piece.checked
+                    is_hanging = bool(hanging >> from_coords((rank, file)) & 1)
+                states[(rank, file)] = (piece_id, selected, checked, (rank, file) in hints, is_hanging)
+        return states
+
+    def _square_rect(self, coords: Tuple[int, int]) -> pygame.Rect:
+        rank, file = coords
+        width, height = int(self.settings.squarewidth), int(self.settings.squareheight)
+        return pygame.Rect(file * width, rank * height, width, height)
+
+    def _mark_hanging(self, surface: pygame.Surface, rect: pygame.Rect) -> None:
+        radius = max(3, rect.width // 12)
+        pygame.draw.circle(surface, (220, 40, 40),
+                           (rect.right - 2 * radius, rect.top + 2 * radius), radius)
+
+    def _draw_square(self, surface: pygame.Surface, coords: Tuple[int, int], state: SquareState) -> pygame.Rect:
+        """Repaint one square: tile, piece with its highlights, hanging mark, then the move hint."""
+        rect = self._square_rect(coords)
+        self.board.render_square(surface, coords, rect.topleft)
+        piece_id, _, _, hinted, hanging = state
+        if piece_id is not None:
+            self.board.get_piece(piece_id).render_piece()
+        if hanging:
+            self._mark_hanging(surface, rect)
+        if hinted:
+            surface.blit(self.next_move_icon, rect)
+        return rect
+
+    def draw(self, surface: pygame.Surface) -> List[pygame.Rect]:
+        """Draw what changed since the last frame and return the dirty rects."""
+        states = self._square_states()
+
+        if self.full_redraw:
+            # draw board
+            self.board.render_board(surface)
+
+            # draw pieces
+            for piece in self.board.get_all_pieces():
+                piece.render_piece()
+            for coords, state in states.items():
+                if state[4]:
+                    self._mark_hanging(surface, self._square_rect(coords))
 
-        # draw pieces
-        for piece in self.board.get_all_pieces():
-            piece.render_piece()
+            # show valid moves
+            for coords in self.move_hints or ():
+                surface.blit(self.next_move_icon, self._square_rect(coords))
 
-        # show valid moves
-        if self.next_moves_surface:
-            surface.blit(self.next_moves_surface, (0, 0))
+            self.coming_soon_panel.invalidate()
+            self.coming_soon_panel.draw(surface)
+            self.drawn_squares = states
+            self.full_redraw = False
+            return [surface.get_rect()]
 
-        self.coming_soon_panel.draw(surface)
+        dirty = [self._draw_square(surface, coords, state)
+                 for coords, state in states.items()
+                 if self.drawn_squares.get(coords) != state]
+        dirty.extend(self.coming_soon_panel.draw(surface))
+        self.drawn_squares = states
+        return dirty
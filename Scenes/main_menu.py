@@ -36,7 +36,7 @@ class MainMenu(Scene):
         # Play button
         self.main_panel.add_component(
             "Button",
-            x=self.game.settings.SCREEN_WIDTH // 2, y=250, width=220, height=60,
+            x=self.game.settings.SCREEN_WIDTH // 2, y=230, width=220, height=60,
             text="Start",
             bg_color=ColorPalette.BUTTON.value,
             hover_color=ColorPalette.BUTTON_HOVER.value,
@@ -47,10 +47,24 @@ class MainMenu(Scene):
             text_color=ColorPalette.TEXT.value
         )
 
+        # Play against the engine
+        self.main_panel.add_component(
+            "Button",
+            x=self.game.settings.SCREEN_WIDTH // 2, y=310, width=220, height=60,
+            text="VS CPU",
+            bg_color=ColorPalette.BUTTON.value,
+            hover_color=ColorPalette.BUTTON_HOVER.value,
+            border_radius=12,
+            on_click=self.game.play_computer,
+            font_size=28,
+            font_style="assets/font/PressStart2P.ttf",
+            text_color=ColorPalette.TEXT.value
+        )
+
         # Quit button
         self.main_panel.add_component(
             "Button",
-            x=self.game.settings.SCREEN_WIDTH // 2, y=350, width=220, height=60,
+            x=self.game.settings.SCREEN_WIDTH // 2, y=390, width=220, height=60,
             text="QUIT",
             bg_color=ColorPalette.BUTTON.value,
             hover_color=ColorPalette.BUTTON_HOVER.value,
@@ -70,6 +84,10 @@ class MainMenu(Scene):
             font_size=16,
             font_style="assets/font/PressStart2P.ttf"
         )
+    def on_enter(self):
+        # The screen was cleared by the scene switch
+        self.main_panel.invalidate()
+
     def handle_event(self, event):
         self.main_panel.handle_event(event)
 
@@ -77,4 +95,4 @@ class MainMenu(Scene):
         pass
 
     def draw(self, screen):
-        self.main_panel.draw(screen)
+        return self.main_panel.draw(screen)
@@ -59,6 +59,10 @@ class PauseMenu(Scene):
             )
 
 
+    def on_enter(self):
+        # The screen was cleared by the scene switch
+        self.overlay.invalidate()
+
     def handle_event(self, event):
         self.overlay.handle_event(event)
 
@@ -66,5 +70,4 @@ class PauseMenu(Scene):
         pass
 
     def draw(self, screen):
-        
-        self.overlay.draw(screen)
+        return self.overlay.draw(screen)
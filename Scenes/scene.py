@@ -13,5 +13,14 @@ class Scene:
     def update(self, dt):
         pass
 
+    def is_busy(self) -> bool:
+        """True while the scene animates or has background work and needs full-rate frames."""
+        return False
+
+    def on_enter(self):
+        """Called when the game switches to this scene."""
+        pass
+
     def draw(self, screen):
+        """Draw the scene; return the dirty rects, or None if the whole screen changed."""
         pass
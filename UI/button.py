@@ -1,5 +1,5 @@
 import pygame
-from typing import Callable, Tuple
+from typing import Callable, Dict, Tuple
 
 from UI.label import Label
 
@@ -25,7 +25,7 @@ class Button:
         bg_color: Tuple[int, int, int] = (50, 50, 50),
         text_color: Tuple[int, int, int] = (255, 255, 255)
     ) -> None:
-        
+
         self.rect = pygame.Rect(x, y, width, height)
 
         self.rect.center = x, y
@@ -43,14 +43,17 @@ class Button:
 
         self.on_click = on_click
 
-        # surface for the button itself
-        self.surface = pygame.Surface((width, height), pygame.SRCALPHA)
-        self.surface_rect = self.surface.get_rect()
-
         # label
         self.label = Label(
             text, font_size,  (width // 2, height // 2), color=text_color,  font_style=font_style)
 
+        # Retained mode: hover/pressed come from events, and each background
+        # colour's finished button is rendered once and reused
+        self.hovered = False
+        self.pressed = False
+        self.dirty = True
+        self._surfaces: Dict[Tuple[int, ...], pygame.Surface] = {}
+
     def handle_click(self):
         if self.on_click:
             self.on_click()
@@ -58,50 +61,75 @@ class Button:
         return False
 
     def was_clicked(self, event):
-        if event.type == pygame.MOUSEBUTTONDOWN and event.button == 1 and self.is_hover():
+        if event.type == pygame.MOUSEBUTTONDOWN and event.button == 1 and self.contains(event.pos):
             self.handle_click()
 
             return True
 
         return False
 
-    def is_hover(self):
-        mouse_pos = pygame.mouse.get_pos()
-        x, y = mouse_pos[0] - self.offset_x, mouse_pos[1] - self.offset_y
+    def contains(self, pos: Tuple[int, int]) -> bool:
+        """True if the screen position `pos` is over the button."""
+        return self.rect.collidepoint(pos[0] - self.offset_x, pos[1] - self.offset_y)
 
-        if self.rect.collidepoint(x, y):
-            return True
+    def update_state(self, pos: Tuple[int, int], mouse_down: bool) -> bool:
+        """Track hover/pressed for the mouse at `pos`; returns True if the look changed."""
+        hovered = self.contains(pos)
+        pressed = hovered and mouse_down
+        if (hovered, pressed) == (self.hovered, self.pressed):
+            return False
+        self.hovered, self.pressed = hovered, pressed
+        self.dirty = True
+        return True
 
-        return False
+    def is_hover(self):
+        return self.hovered
 
     def is_active(self):
-        mouse_btns = pygame.mouse.get_pressed()
-        if mouse_btns[0]:
-            return True
-        return False
-
-    def draw(self, target_surface):
-        bg_color = self.bg_color
-        if self.is_hover():
-            bg_color = self.hover_color if not self.is_active() else self.active_color
-
+        return self.pressed
+
+    def set_text(self, text: str) -> None:
+        self.label.set_text(text)
+        if self.label.dirty:
+            self._surfaces.clear()
+            self.dirty = True
+
+    def _current_color(self) -> Tuple[int, ...]:
+        if not self.hovered:
+            return self.bg_color
+        return self.active_color if self.pressed else self.hover_color
+
+    def _render(self, bg_color: Tuple[int, ...]) -> pygame.Surface:
+        surface = pygame.Surface(self.rect.size, pygame.SRCALPHA)
+        surface_rect = surface.get_rect()
         pygame.draw.rect(
-            self.surface,
+            surface,
             bg_color,
-            self.surface_rect,
+            surface_rect,
             border_radius=self.border_radius
         )
 
         if self.border_color is not None and self.border_width > 0:
 
             pygame.draw.rect(
-                self.surface,
+                surface,
                 self.border_color,
-                self.surface_rect,
+                surface_rect,
                 width=self.border_width,
                 border_radius=self.border_radius
             )
 
-        self.label.draw(self.surface)
+        self.label.draw(surface)
+        return surface
+
+    @property
+    def surface(self) -> pygame.Surface:
+        bg_color = self._current_color()
+        surface = self._surfaces.get(bg_color)
+        if surface is None:
+            surface = self._surfaces[bg_color] = self._render(bg_color)
+        return surface
 
+    def draw(self, target_surface):
         target_surface.blit(self.surface, (self.rect.x, self.rect.y))
+        self.dirty = False
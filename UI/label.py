@@ -1,5 +1,7 @@
 import pygame
-from typing import Tuple
+from typing import List, Tuple
+
+from assets import get_font, render_text
 
 
 class Label:
@@ -19,28 +21,49 @@ class Label:
         self.text = text
         self.font_size = font_size
         self.color = color
-        self.font = pygame.font.Font(font_style, self.font_size)
-        self.font.set_bold(bold)
-        self.text_surface = self.font.render(self.text, True, self.color)
-        self.text_rect = self.text_surface.get_rect(center=pos)
+        self.pos = pos
+        self.font_style = font_style
+        self.bold = bold
+        self.font = get_font(font_style, self.font_size, bold)
         self.line_spacing = line_spacing
-        self.lines = []
+        self.lines: List[Tuple[pygame.Surface, pygame.Rect]] = []
 
-        if "/b/" in self.text:
-            for i, line in enumerate(self.text.split("/b/")):
-                new_line_surf = self.font.render(line, True, self.color)
-                rect = new_line_surf.get_rect()
+        # Retained mode: text is rendered once and again only when it changes
+        self.dirty = True
+        self._render()
 
-                rect.midtop = pos[0], pos[1] + i * \
+    def _render(self) -> None:
+        """Render every line of text ("/b/" separates lines) into cached surfaces."""
+        self.lines = []
+        for i, line in enumerate(self.text.split("/b/")):
+            surf = render_text(line, self.color, self.font_style, self.font_size, self.bold)
+            if "/b/" in self.text:
+                rect = surf.get_rect()
+                rect.midtop = self.pos[0], self.pos[1] + i * \
                     (self.font_size + self.line_spacing)
+            else:
+                rect = surf.get_rect(center=self.pos)
+            self.lines.append((surf, rect))
+        self.text_surface, self.text_rect = self.lines[0]
+
+    @property
+    def rect(self) -> pygame.Rect:
+        """Area covered by every line, in the coordinates of the surface drawn on."""
+        return self.lines[0][1].unionall([rect for _, rect in self.lines[1:]])
+
+    def set_text(self, text: str) -> None:
+        if text != self.text:
+            self.text = text
+            self._render()
+            self.dirty = True
 
-                self.lines.append((new_line_surf, rect))
-        else:
-            self.text_surface = self.font.render(self.text, True, self.color)
+    def set_color(self, color: Tuple[int, int, int]) -> None:
+        if color != self.color:
+            self.color = color
+            self._render()
+            self.dirty = True
 
     def draw(self, surface: pygame.Surface):
-        if self.lines:
-            for surf, rect in self.lines:
-                surface.blit(surf, rect)
-            return
-        surface.blit(self.text_surface, self.text_rect)
+        for surf, rect in self.lines:
+            surface.blit(surf, rect)
+        self.dirty = False
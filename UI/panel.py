@@ -1,5 +1,5 @@
 import pygame
-from typing import Type, List, Tuple
+from typing import Dict, Type, List, Optional, Tuple
 from UI.button import Button
 from UI.label import Label
 
@@ -34,45 +34,93 @@ class Panel:
         self.border_color = border_color
         self.bg_color = bg_color
 
-    def add_component(self, component_type: str, **kwargs):
-        component_cls = components.get(component_type, None)
-        if not component_cls:
-            return
-
-        kwargs["offset_x"] = self.rect.x
-        kwargs["offset_y"] = self.rect.y
-
-        comp = component_cls(**kwargs)
-        self.components.append(comp)
-
-    def draw(self, screen):
-
+        # Retained mode: background and border are drawn once; self.surface holds
+        # the composed panel and is rebuilt only when a component changes
+        self.background = self._render_background()
+        self.needs_full_draw = True
+        # what the screen showed under the panel, to restore before partial re-blits
+        self.backdrop: Optional[pygame.Surface] = None
+        # panel-local rect each component covered when last composed
+        self.drawn_rects: Dict[int, pygame.Rect] = {}
+
+    def _render_background(self) -> pygame.Surface:
+        background = pygame.Surface(self.rect.size, pygame.SRCALPHA)
         pygame.draw.rect(
-            self.surface,
+            background,
             self.bg_color,
-            self.surface.get_rect(),
+            background.get_rect(),
             border_radius=self.border_radius
         )
 
         if self.border_color and self.border_width:
             pygame.draw.rect(
-                self.surface,
+                background,
                 self.border_color,
-                self.surface.get_rect(),
+                background.get_rect(),
                 border_radius=self.border_radius,
                 width=self.border_width
 
             )
-        for comp in self.components:
-            comp.draw(self.surface)
-        screen.blit(self.surface, self.rect.topleft)
+        return background
 
-    def handle_event(self, event):
-        if event.type == pygame.MOUSEBUTTONDOWN:
-            for comp in self.components:
+    def add_component(self, component_type: str, **kwargs):
+        """Create a component at a panel-relative position; returns it so it can be updated."""
+        component_cls = components.get(component_type, None)
+        if not component_cls:
+            return None
 
-                if hasattr(comp, "was_clicked"):
-                    comp.was_clicked(event)
+        kwargs["offset_x"] = self.rect.x
+        kwargs["offset_y"] = self.rect.y
+
+        comp = component_cls(**kwargs)
+        self.components.append(comp)
+        self.needs_full_draw = True
+        return comp
+
+    def invalidate(self) -> None:
+        """Force a full blit on the next draw, e.g. after the screen was cleared."""
+        self.needs_full_draw = True
+        # the mouse may have moved while another scene was shown
+        self._update_buttons(pygame.mouse.get_pos(), pygame.mouse.get_pressed()[0])
+
+    def _compose(self) -> None:
+        self.surface.fill((0, 0, 0, 0))
+        self.surface.blit(self.background, (0, 0))
+        for i, comp in enumerate(self.components):
+            comp.draw(self.surface)
+            self.drawn_rects[i] = comp.rect.copy()
+
+    def draw(self, screen) -> List[pygame.Rect]:
+        """Blit the cached panel; returns the screen rects that changed (empty when idle)."""
+        if self.needs_full_draw:
+            self._compose()
+            area = self.rect.clip(screen.get_rect())
+            self.backdrop = screen.subsurface(area).copy()
+            screen.blit(self.surface, self.rect.topleft)
+            self.needs_full_draw = False
+            return [area]
+
+        changed = [i for i, comp in enumerate(self.components) if comp.dirty]
+        if not changed:
+            return []
+
+        # Covers both where the component was and where it is now (text may resize)
+        areas = [self.drawn_rects[i].union(self.components[i].rect) for i in changed]
+        self._compose()
+        dirty = []
+        for area in areas:
+            area = area.clip(self.surface.get_rect())
+            screen_rect = area.move(self.rect.topleft)
+            # Translucent panels blend with the screen, so put back what was under them first
+            screen.blit(self.backdrop, screen_rect, area)
+            screen.blit(self.surface, screen_rect, area)
+            dirty.append(screen_rect)
+        return dirty
+
+    def _update_buttons(self, pos: Tuple[int, int], mouse_down: bool) -> None:
+        for comp in self.components:
+            if isinstance(comp, Button):
+                comp.update_state(pos, mouse_down)
 
         hovering = any(btn.is_hover()
                        for btn in self.components if isinstance(btn, Button))
@@ -82,4 +130,14 @@ class Panel:
                 pygame.SYSTEM_CURSOR_ARROW)
             self.hovering = hovering
 
+    def handle_event(self, event):
+        if event.type == pygame.MOUSEMOTION:
+            self._update_buttons(event.pos, bool(event.buttons[0]))
+        elif event.type in (pygame.MOUSEBUTTONDOWN, pygame.MOUSEBUTTONUP) and event.button == 1:
+            self._update_buttons(event.pos, event.type == pygame.MOUSEBUTTONDOWN)
+
+        if event.type == pygame.MOUSEBUTTONDOWN:
+            for comp in self.components:
 
+                if hasattr(comp, "was_clicked"):
+                    comp.was_clicked(event)
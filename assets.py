@@ -0,0 +1,76 @@
+import pygame
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+
+# (colour, piece type, (width, height)) -> sprite shared by every piece that uses it
+_piece_sprites: Dict[Tuple[str, str, Tuple[int, int]], pygame.Surface] = {}
+# (path, (width, height)) -> any other image, e.g. the move hint
+_images: Dict[Tuple[str, Tuple[int, int]], pygame.Surface] = {}
+# (font path or None for the default font, size, bold) -> loaded font
+FontKey = Tuple[Optional[str], int, bool]
+_fonts: Dict[FontKey, pygame.font.Font] = {}
+# (font key, text, colour) -> rendered text, least recently used first
+TEXT_CACHE_SIZE = 512
+_text_surfaces: "OrderedDict[Tuple[FontKey, str, Tuple[int, ...]], pygame.Surface]" = OrderedDict()
+
+
+def _load_scaled(path: str, size: Tuple[int, int]) -> pygame.Surface:
+    image = pygame.image.load(path)
+    # convert_alpha needs a display; headless callers get the raw image
+    if pygame.display.get_surface() is not None:
+        image = image.convert_alpha()
+    if image.get_size() != size:
+        image = pygame.transform.scale(image, size)
+    return image
+
+
+def get_piece_sprite(color: str, piece_type: str, size: Tuple[int | float, int | float]) -> pygame.Surface:
+    """Load, convert and scale a piece sprite once; later calls return the same surface."""
+    size = (int(size[0]), int(size[1]))
+    key = (color, piece_type, size)
+    sprite = _piece_sprites.get(key)
+    if sprite is None:
+        sprite = _piece_sprites[key] = _load_scaled(f"assets/{color}/{piece_type}.png", size)
+    return sprite
+
+
+def get_image(path: str, size: Tuple[int | float, int | float]) -> pygame.Surface:
+    """Same caching as get_piece_sprite, for any image path."""
+    size = (int(size[0]), int(size[1]))
+    key = (path, size)
+    image = _images.get(key)
+    if image is None:
+        image = _images[key] = _load_scaled(path, size)
+    return image
+
+
+def get_font(path: Optional[str], size: int, bold: bool = False) -> pygame.font.Font:
+    """Open each (font file, size, bold) once and share it between every caller."""
+    key = (path, size, bold)
+    font = _fonts.get(key)
+    if font is None:
+        font = _fonts[key] = pygame.font.Font(path, size)
+        font.set_bold(bold)
+    return font
+
+
+def render_text(text: str, color: Tuple[int, ...], path: Optional[str], size: int,
+                bold: bool = False) -> pygame.Surface:
+    """Render antialiased text through a bounded LRU cache; do not draw on the result."""
+    key = ((path, size, bold), text, tuple(color))
+    surface = _text_surfaces.get(key)
+    if surface is not None:
+        _text_surfaces.move_to_end(key)
+        return surface
+    surface = _text_surfaces[key] = get_font(path, size, bold).render(text, True, color)
+    if len(_text_surfaces) > TEXT_CACHE_SIZE:
+        _text_surfaces.popitem(last=False)
+    return surface
+
+
+def clear_sprite_cache() -> None:
+    """Drop every cached sprite, e.g. after the display mode changes."""
+    _piece_sprites.clear()
+    _images.clear()
+    _text_surfaces.clear()
@@ -1,11 +1,17 @@
 import pygame
 from pieces import Piece
 import pieces
+from Rules.position import STARTING_FEN, Position, Undo
+from Rules.bitboard import COLOR_NAMES, PIECE_NAMES, to_coords
+from assets import get_font
+from Rules.move import (EP_CAPTURE, KING_CASTLE, QUEEN_CASTLE, move_flag, move_from,
+                        move_to, is_capture, is_promotion, promotion_piece)
 
-from typing import Tuple, List, TYPE_CHECKING, Optional, Iterator
+from typing import Dict, Tuple, List, TYPE_CHECKING, Optional, Iterator
 
 if TYPE_CHECKING:
     from main_old import Game
+    from Scenes.game_scene import GameScene
 
 
 piece_classes = {
@@ -19,12 +25,44 @@ piece_classes = {
 
 
 class Board:
-    def __init__(self, settings) -> None:
-        self.BOARD_SIZE = settings.BOARD_SIZE
+    def __init__(self, settings=None, fen: str = STARTING_FEN) -> None:
+        """A board set up from `fen` (ValueError if invalid).
+
+        Without settings the board is rules-only: it holds the position and
+        its history but no sprites, and cannot be drawn. Sprites are added
+        by the players, from the position.
+        """
         self.settings = settings
-        self.board = settings.emptyboard
-        self.size = settings.BOARD_SIZE
+        self.BOARD_SIZE = settings.BOARD_SIZE if settings is not None else 8
+        self.size = self.BOARD_SIZE
+        self.board = [[None] * self.size for _ in range(self.size)]
         self.pieces = {}
+        # Where clear() goes back to
+        self.start_fen = fen
+        # Headless rules core; the sprites above only mirror it
+        self.position = self._prepare(Position.from_fen(fen))
+        # Zobrist keys of every position reached this game, for repetition checks
+        self.key_history: List[int] = [self.position.key]
+        # Undo records for takebacks, and the sprites those moves took off the board
+        self.undo_stack: List[Undo] = []
+        self.off_board: Dict[str, Piece] = {}
+        # Numbers promoted pieces, so a pawn that promotes again after a takeback gets a new id
+        self.promotions = 0
+        # Pre-rendered board background; see get_background()
+        self.background: Optional[pygame.Surface] = None
+        self.background_key: Optional[tuple] = None
+
+    @classmethod
+    def from_fen(cls, fen: str, settings=None) -> "Board":
+        """A board set up from `fen`; rules-only unless `settings` are given."""
+        return cls(settings, fen)
+
+    def to_fen(self) -> str:
+        return self.position.to_fen()
+
+    def _prepare(self, position: Position) -> Position:
+        # Only the on-screen board is queried often enough to pay for an attack map
+        return position.track_attacks() if self.settings is not None else position
 
     def set_piece(self, piece: Piece) -> None:
         rank, file = piece.rank, piece.file
@@ -68,6 +106,7 @@ class Board:
         if piece_type not in piece_classes:
             raise ValueError(f"Invalid piece type: {piece_type}")
         rank, file = coords
+        self.promotions += 1
 
         piece_class = piece_classes[piece_type]
         print(piece_class)
@@ -77,32 +116,160 @@ class Board:
              game.settings.squareheight),
             (game.settings.SCREEN_WIDTH,
              game.settings.SCREEN_HEIGHT),
-            f"assets/{piece_id[0]}/{piece_type}.png",
             game.settings.padding,
-            f"{piece_id[0]}_{piece_type}_{piece_id[1][-1]}",
+            f"{piece_id[0]}_{piece_type}_{piece_id[1][-1]}_{self.promotions}",
             color,
             game
         )
         game.get_current_player().pieces.append(piece.id)
 
+    def play_move(self, move: int, game: "GameScene") -> None:
+        """Play a rules-core move and mirror it onto the piece sprites."""
+        start, target = to_coords(move_from(move)), to_coords(move_to(move))
+        flag = move_flag(move)
+        piece = self.get_piece(coords=start)
+
+        if is_capture(move):
+            # En passant takes the pawn beside the mover, not on the target square
+            captured_id = self.get_piece_id(
+                (start[0], target[1]) if flag == EP_CAPTURE else target)
+            self.off_board[captured_id] = self.get_piece(captured_id)
+            self.remove_piece(captured_id)
+            game.get_next_player().pieces.remove(captured_id)
+
+        self.move_piece_on_board(piece.id, target)
+
+        if flag in (KING_CASTLE, QUEEN_CASTLE):
+            rank, file = target
+            rook_file, rook_target = (7, file - 1) if flag == KING_CASTLE else (0, file + 1)
+            self.move_piece_on_board(self.get_piece_id((rank, rook_file)), (rank, rook_target))
+
+        if is_promotion(move):
+            self.off_board[piece.id] = piece
+            self.remove_piece(piece.id)
+            game.get_current_player().pieces.remove(piece.id)
+            self.create_piece(PIECE_NAMES[promotion_piece(move)], target,
+                              piece.id.split('_'), piece.color, game)
+
+        self.undo_stack.append(self.position.make_move(move))
+        self.key_history.append(self.position.key)
+
+    def takeback(self, game: "GameScene") -> bool:
+        """Undo the last move on the position and put the sprites back to match."""
+        if not self.undo_stack:
+            return False
+        self.position.unmake_move(self.undo_stack.pop())
+        self.key_history.pop()
+        self.sync_pieces(game)
+        return True
+
+    def sync_pieces(self, game: "GameScene") -> None:
+        """Move, revive or retire sprites until they match the rules-core position."""
+        wanted = {}
+        for sq, code in enumerate(self.position.mailbox):
+            if code is not None:
+                color, ptype = divmod(code, 6)
+                wanted[to_coords(sq)] = (COLOR_NAMES[color], PIECE_NAMES[ptype])
+
+        displaced = [piece for piece in self.pieces.values()
+                     if wanted.get(piece.pos) != (piece.color, piece.type)]
+        for piece in displaced:
+            self.board[piece.rank][piece.file] = None
+
+        # Latest off the board first, as a takeback restores the last capture; an
+        # off-board sprite whose id is in use again can never be put back
+        spares = displaced + [piece for piece in reversed(self.off_board.values())
+                              if piece.id not in self.pieces]
+        for coords, (color, ptype) in wanted.items():
+            if self.get_piece_id(coords) is not None:
+                continue
+            piece = next(p for p in spares if (p.color, p.type) == (color, ptype))
+            spares.remove(piece)
+            if piece.id not in self.pieces:
+                del self.off_board[piece.id]
+                self.pieces[piece.id] = piece
+                game.get_player(color).pieces.append(piece.id)
+            piece.rank, piece.file = coords
+            piece.selected = False
+            self.board[piece.rank][piece.file] = piece.id
+
+        for piece in displaced:
+            if piece in spares:
+                self.pieces.pop(piece.id)
+                game.get_player(piece.color).pieces.remove(piece.id)
+                self.off_board[piece.id] = piece
+
+    @property
+    def key(self) -> int:
+        """Zobrist key of the current position."""
+        return self.position.key
+
+    def repetitions(self) -> int:
+        """How many times the current position has occurred this game."""
+        return self.key_history.count(self.position.key)
+
     def __str__(self) -> str:
         return "\n".join(str(rank) for rank in self.board)
 
     def __len__(self) -> int:
         return self.size
 
-    def clear(self):
-        self.board = self.settings.emptyboard
+    def clear(self, fen: Optional[str] = None):
+        """Remove every sprite and go back to the start position, or to `fen` from now on."""
+        # Parsed first, so an invalid FEN leaves the board as it was
+        position = Position.from_fen(fen if fen is not None else self.start_fen)
+        if fen is not None:
+            self.start_fen = fen
+        self.board = [[None] * self.size for _ in range(self.size)]
         self.pieces.clear()
+        self.position = self._prepare(position)
+        self.key_history = [self.position.key]
+        self.undo_stack.clear()
+        self.off_board.clear()
 
-    def render_board(self, screen: pygame.Surface, size: Tuple[int | float, int | float], tiles: list[pygame.Surface]) -> None:
-        width, height = size
+    def _background_key(self) -> tuple:
+        return (int(self.settings.squarewidth), int(self.settings.squareheight),
+                tuple(map(tuple, self.settings.squareColors)), self.settings.show_coordinates)
+
+    def _build_background(self) -> pygame.Surface:
+        """Render the checkerboard and its coordinate labels into one surface."""
+        width, height = int(self.settings.squarewidth), int(self.settings.squareheight)
+        colors = self.settings.squareColors
+        background = pygame.Surface((width * self.BOARD_SIZE, height * self.BOARD_SIZE))
+        if pygame.display.get_surface() is not None:
+            background = background.convert()
 
-        y = 0
         for rank in range(self.BOARD_SIZE):
-            x = 0
             for file in range(self.BOARD_SIZE):
+                background.fill(colors[(rank+file) % 2],
+                                pygame.Rect(file * width, rank * height, width, height))
+
+        if self.settings.show_coordinates:
+            font = get_font(self.settings.coordinates_font, max(6, height // 8))
+            last = self.BOARD_SIZE - 1
+            for index in range(self.BOARD_SIZE):
+                # Rank numbers down the left edge, file letters along the bottom,
+                # each drawn in the colour of the other square shade
+                rank_label = font.render(str(self.BOARD_SIZE - index), True, colors[(index+1) % 2])
+                background.blit(rank_label, (3, index * height + 3))
+                file_label = font.render("abcdefgh"[index], True, colors[(last+index+1) % 2])
+                background.blit(file_label, file_label.get_rect(
+                    bottomright=((index + 1) * width - 3, self.BOARD_SIZE * height - 3)))
+        return background
+
+    def get_background(self) -> pygame.Surface:
+        """Cached board background, rebuilt only when square size or colours change."""
+        key = self._background_key()
+        if key != self.background_key:
+            self.background = self._build_background()
+            self.background_key = key
+        return self.background
+
+    def render_square(self, screen: pygame.Surface, coords: Tuple[int, int], topleft: Tuple[int, int]) -> None:
+        rank, file = coords
+        width, height = int(self.settings.squarewidth), int(self.settings.squareheight)
+        screen.blit(self.get_background(), topleft,
+                    area=pygame.Rect(file * width, rank * height, width, height))
 
-                screen.blit(tiles[(rank+file) % 2], (x, y))
-                x += width
-            y += height
+    def render_board(self, screen: pygame.Surface) -> None:
+        screen.blit(self.get_background(), (0, 0))
@@ -1,3 +1,4 @@
+import argparse
 import pygame
 import logging
 from rich.logging import RichHandler
@@ -8,6 +9,8 @@ from  settings import Settings,ColorPalette
 from Scenes.main_menu import MainMenu
 from Scenes.game_scene import GameScene
 from Scenes.pause_menu import PauseMenu
+from Rules.position import Position
+from typing import List, Optional
 
 # Logging setup
 logging.basicConfig(
@@ -19,10 +22,12 @@ logging.basicConfig(
 
 
 class Game:
-    def __init__(self) -> None:
+    def __init__(self, fen: Optional[str] = None) -> None:
         pygame.init()
 
         self.settings = Settings()
+        if fen is not None:
+            self.settings.start_fen = fen
         self._set_window()
         self._set_clock()
 
@@ -48,6 +53,7 @@ class Game:
     def switch_scene(self,scene):
         self.current_scene = scene
         self.screen.fill(ColorPalette.BLACK.value)
+        scene.on_enter()
         self.update_title()
 
 
@@ -76,6 +82,14 @@ class Game:
         self.switch_scene(self.mainmenu_scene)
 
     def play(self):
+        self.settings.computer_colors = ()
+        self.start_game()
+
+    def play_computer(self):
+        self.settings.computer_colors = ("black",)
+        self.start_game()
+
+    def start_game(self):
         self.gamescene.restart()
 
         pygame.mouse.set_cursor(
@@ -89,24 +103,54 @@ class Game:
         dt = self.clock.tick(self.settings.frame_rate)
         return dt / 1000  # convert to seconds
 
+    def _wait_for_events(self) -> list:
+        """Idle mode: block until something happens instead of spinning at the frame rate."""
+        event = pygame.event.wait(self.settings.idle_timeout)
+        events = [] if event.type == pygame.NOEVENT else [event]
+        events.extend(pygame.event.get())
+        return events
+
     def run(self) -> None:
         while self.running:
-            dt = self._tick_clock()
+            if self.current_scene.is_busy():
+                dt = self._tick_clock()
+                events = pygame.event.get()
+            else:
+                events = self._wait_for_events()
+                dt = self.clock.tick() / 1000  # time spent waiting, in seconds
 
             # global events (like quitting)
-            for event in pygame.event.get():
+            for event in events:
                 if event.type == pygame.QUIT:
                     self.running = False
                 else:
                     # current scene handle your own events!!!
                     self.current_scene.handle_event(event)
 
-            # update + render
+            # update + render; scenes that track dirty rects only push those
             self.current_scene.update(dt)
-            self.current_scene.draw(self.screen)
+            dirty = self.current_scene.draw(self.screen)
+
+            if dirty is None:
+                pygame.display.flip()
+            elif dirty:
+                pygame.display.update(dirty)
+
+        self.gamescene.close()
+
 
-            pygame.display.flip()
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Play PyChuss.")
+    parser.add_argument("--fen", default=None, help="start every game from this position")
+    args = parser.parse_args(argv)
+    if args.fen is not None:
+        try:
+            Position.from_fen(args.fen)
+        except ValueError as error:
+            parser.error(str(error))
+    Game(args.fen).run()
+    return 0
 
 
 if __name__ == "__main__":
-    Game().run()
+    raise SystemExit(main())
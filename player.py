@@ -1,10 +1,16 @@
 
 
+import threading
 import pygame
 import pieces
+from Rules.bitboard import COLOR_NAMES, PIECE_NAMES, QUEEN, from_coords, iter_bits, to_coords
+from Rules.move import is_promotion, move_from, move_to, promotion_piece, to_uci
+from Rules.position import Position
+from Rules.search import Searcher
+from Rules.smp import ParallelSearcher
 
 
-from typing import TYPE_CHECKING, Tuple
+from typing import TYPE_CHECKING, Dict, List, Optional, Tuple
 if TYPE_CHECKING:
     from Scenes.game_scene import GameScene
     from pieces import King
@@ -18,12 +24,6 @@ logging.basicConfig(
     datefmt="[%X]",
     handlers=[RichHandler()]
 )
-start_ranks = {
-    "black": 0,
-    "white": 6
-}
-
-
 piece_classes = {
     "pawn": pieces.Pawn,
     "queen": pieces.Queen,
@@ -34,103 +34,112 @@ piece_classes = {
 }
 
 
-piece_map = [
-    ["pawn"] * 8,
-    ["rook_1", "knight_1", "bishop_1", "queen",
-        "king", "bishop_2", "knight_2", "rook_2"]
-]
+def piece_id_suffix(piece_type: str, count: int) -> str:
+    """Id suffix of the `count`th piece of a type: pawn0..7, rook1/rook2, queen, queen2, ..."""
+    if piece_type == "pawn":
+        return str(count)
+    if piece_type in ("queen", "king") and count == 0:
+        return ""
+    return str(count + 1)
 
 
 class Player:
+    is_computer = False
+
     def __init__(self, game: "GameScene", color: str) -> None:
         """Initialize a player with their pieces and state."""
         self.color = color
         self.game_scene = game
-        self.start_rank = start_ranks[color]
         self.pieces: list[str] = []
         self.selected = False
         self.selected_piece: str = ""
         self._create_pieces()
         # Always keep a direct reference to the king piece
         self.king: King = self.game_scene.board.get_piece(f"{self.color}_king")
-        self.playable_moves_in_check = -1
         self.turn_complete = False
-        
-    
+
     def _create_pieces(self) -> None:
-        """Create and place all pieces for this player."""
-        rank = self.start_rank
-        local_piece_map = piece_map[::-
-                                    1] if self.color == "black" else piece_map
-        for piece_rank in local_piece_map:
-            for file, piece_name in enumerate(piece_rank):
-                piece_data = piece_name.split('_')
-                piece_type = piece_data[0]
-                piece_class = piece_classes[piece_type]
-                # Use index for pawns, otherwise use suffix if present
-                piece_index = str(file) if piece_type == "pawn" else (
-                    piece_data[1] if len(piece_data) == 2 else "")
-                piece_id = f"{self.color}_{piece_type}{piece_index}"
-                piece = piece_class(
+        """Create a sprite for each of this player's pieces in the board's position."""
+        position = self.game_scene.board.position
+        color = COLOR_NAMES.index(self.color)
+        counts: Dict[str, int] = {}
+        # Walk a8..h1 so the standard setup gets the usual ids (rook1 on the a-file)
+        for rank in range(8):
+            for file in range(8):
+                found = position.piece_at(from_coords((rank, file)))
+                if found is None or found[0] != color:
+                    continue
+                piece_type = PIECE_NAMES[found[1]]
+                count = counts.get(piece_type, 0)
+                counts[piece_type] = count + 1
+                piece_id = f"{self.color}_{piece_type}{piece_id_suffix(piece_type, count)}"
+                piece_classes[piece_type](
                     (rank, file),
                     (self.game_scene.settings.squarewidth,
                      self.game_scene.settings.squareheight),
                     (self.game_scene.settings.SCREEN_WIDTH,
                      self.game_scene.settings.SCREEN_HEIGHT),
-                    f"assets/{self.color}/{piece_type}.png",
                     self.game_scene.settings.padding,
                     piece_id,
                     self.color,
                     self.game_scene,
                 )
                 self.pieces.append(piece_id)
-            rank += 1
 
-    def get_all_valid_moves(self, save: bool = False):
-        """Yield (valid_moves, piece) for all pieces of this player."""
-        for piece_id in self.pieces:
-            piece = self.game_scene.board.get_piece(piece_id)
-            if piece.type == "pawn":
-                valid_moves,check_by = piece.get_pawn_capture_moves(self.pieces,False)
-            else:
-                # logging.debug(f"Getting moves for {piece.id}")
-                valid_moves, check_by = piece.generate_validmoves(
-                    self.pieces,  False)
-            yield valid_moves, check_by
-
-    def is_mate(self):
-        """Check if the player is in checkmate."""
-        # if self.king.checked and self.king.valid_moves is not None and not self.king.valid_moves:
-        #     print(f"{self.game_scene.get_current_player().color} has been checkmated!")
-        self.king.generate_safe_king_moves(self.pieces)
+    def is_mate(self, has_moves: bool):
+        """Check if the player is in checkmate or stalemate."""
+        if has_moves:
+            return
         if self.king.checked:
-            self.king.generate_check_defenses(self.pieces)
-
-        if self.playable_moves_in_check == 0 and self.king.checked:
             logging.warning(
                 f"{self.game_scene.get_current_player().color} has been checkmated!")
-            self.game_scene.is_game_over = True
-
-    
+        else:
+            logging.warning(
+                f"{self.game_scene.get_current_player().color} has been stalemated!")
+        self.game_scene.is_game_over = True
 
     def start_turn(self, opp_player: "Player"):
-        """Prepare for this player's turn: update king's moves and check status."""
-        self.king.checked = False
-        self.king.checking_pieces.clear()
-        self.is_mate()
-        self.king.detect_pins(self.pieces)
-        
+        """Prepare for this player's turn: load legal moves and check status from the rules core."""
+        board = self.game_scene.board
+        position = board.position
+
+        checkers = position.checkers()
+        self.king.checked = bool(checkers)
+        self.king.checking_pieces = [board.get_piece_id(to_coords(sq))
+                                     for sq in iter_bits(checkers)]
+
+        for piece_id in self.pieces:
+            board.get_piece(piece_id).valid_moves = {}
+
+        legal_moves = position.legal_moves()
+        for move in legal_moves:
+            # The board only offers queen promotions for now
+            if is_promotion(move) and promotion_piece(move) != QUEEN:
+                continue
+            piece = board.get_piece(coords=to_coords(move_from(move)))
+            piece.valid_moves[to_coords(move_to(move))] = move
+
+        self.is_mate(bool(legal_moves))
+        if board.repetitions() >= 3:
+            logging.warning("Draw by threefold repetition!")
+            self.game_scene.is_game_over = True
+
     def revoke_turn(self):
-        self.playable_moves_in_check = 0
         self.king.checked = False
         for piece_id in self.pieces:
             piece = self.game_scene.board.get_piece(piece_id)
-            piece.valid_moves = None
-            piece.pinned_status = {"pinned": False, "allowed_dir": ["all"]}
-            
-            
+            piece.valid_moves = {}
+
+    def update(self) -> None:
+        """Called every frame during this player's turn; humans move from events instead."""
+        pass
 
-    
+    def is_thinking(self) -> bool:
+        return False
+
+    def close(self) -> None:
+        """Release anything held across turns; the player is discarded afterwards."""
+        pass
 
     def _handle_move_selected_piece(self, pos: Tuple[int, int]) -> None:
         """Handle moving the selected piece to a new position."""
@@ -143,7 +152,7 @@ class Player:
         self.game_scene.board.pieces[piece_id].selected = False
         self.selected_piece = ''
         self.selected = False
-        self.game_scene.next_moves_surface = None
+        self.game_scene.move_hints = None
 
     def _handle_switch_selected_piece(self, piece_id: str) -> None:
         """Switch selection to another of the player's own pieces."""
@@ -151,7 +160,7 @@ class Player:
         self.selected_piece = piece_id
         self.game_scene.board.get_piece(piece_id).selected = True
         self.game_scene.board.get_piece(
-            piece_id).make_move_surface()
+            piece_id).show_move_hints()
 
     def _handle_capture_opponent_piece(self, pos: Tuple[int, int]) -> None:
         """Handle capturing an opponent's piece."""
@@ -160,13 +169,11 @@ class Player:
 
     def _handle_select_own_piece(self, piece_id: str) -> None:
         """Select one of the player's own pieces."""
-        if self.king.checked:
-            self.king.highlight_check()
         self.game_scene.board.get_piece(piece_id).selected = True
         self.selected_piece = piece_id
         self.selected = True
         self.game_scene.board.get_piece(
-            piece_id).make_move_surface()
+            piece_id).show_move_hints()
 
     def check_selection(self, event: pygame.event.Event) -> None:
         if event.type != pygame.MOUSEBUTTONDOWN or event.button != 1:
@@ -209,3 +216,84 @@ class Player:
         # If no piece is selected and user clicks their own piece: select it
         if not self.selected and piece_id is not None and piece_id in self.pieces:
             self._handle_select_own_piece(piece_id)
+
+
+class ComputerPlayer(Player):
+    """A player whose moves come from the opening book, else Rules.search on a background thread."""
+    is_computer = True
+
+    def __init__(self, game: "GameScene", color: str) -> None:
+        super().__init__(game, color)
+        settings = game.settings
+        if settings.engine_workers > 1:
+            tablebase_dir = settings.tablebase_dir if game.tablebases is not None else None
+            self.searcher = ParallelSearcher(settings.engine_workers, settings.engine_hash_mb, tablebase_dir)
+        else:
+            self.searcher = Searcher(settings.engine_hash_mb, tablebases=game.tablebases)
+        self.thread: Optional[threading.Thread] = None
+        self.best_move: Optional[int] = None
+
+    def start_turn(self, opp_player: "Player"):
+        super().start_turn(opp_player)
+        if self.game_scene.is_game_over:
+            return
+        board = self.game_scene.board
+        self.best_move = None
+        book = self.game_scene.book
+        if book is not None:
+            # No search needed: update() plays the move on the next frame, and
+            # is_thinking() keeps frames coming until it has
+            self.best_move = book.choose(board.position, self.game_scene.settings.book_mode)
+            if self.best_move is not None:
+                logging.info(f"{self.color} engine: book move {to_uci(self.best_move)}")
+                return
+        # Cleared here, not in search(): cancel() may stop the search before it begins
+        self.searcher.clear_stop()
+        # The search gets its own copies; the board keeps changing on this thread
+        self.thread = threading.Thread(
+            target=self._think, args=(board.position.copy(), list(board.key_history)), daemon=True)
+        self.thread.start()
+
+    def _think(self, position: Position, history: List[int]) -> None:
+        settings = self.game_scene.settings
+        result = self.searcher.search(position, settings.engine_max_depth,
+                                      settings.engine_time_limit, settings.engine_node_limit, history)
+        logging.info(f"{self.color} engine: {result}")
+        self.best_move = result.move
+
+    def is_thinking(self) -> bool:
+        """True while a search runs or its move is still waiting for update()."""
+        if self.best_move is not None and not self.turn_complete:
+            return True
+        return self.thread is not None and self.thread.is_alive()
+
+    def update(self) -> None:
+        """Play the searched move once the background search has finished."""
+        if self.best_move is None or self.turn_complete:
+            return
+        move, self.best_move = self.best_move, None
+        self.thread = None
+        self.game_scene.board.play_move(move, self.game_scene)
+        self.turn_complete = True
+
+    def revoke_turn(self):
+        self.cancel()
+        super().revoke_turn()
+
+    def cancel(self) -> None:
+        """Stop a search in progress and drop its move."""
+        # A book move is pending without a thread, so is_thinking() is not enough here
+        if self.thread is not None and self.thread.is_alive():
+            self.searcher.stop()
+            self.thread.join()
+        self.thread = None
+        self.best_move = None
+
+    def close(self) -> None:
+        self.cancel()
+        if isinstance(self.searcher, ParallelSearcher):
+            self.searcher.close()
+
+    def check_selection(self, event: pygame.event.Event) -> None:
+        # Moves come from the search, not the mouse
+        pass
@@ -1,6 +1,8 @@
 import pygame
 from enum import Enum
 
+from Rules.position import STARTING_FEN
+
 class ColorPalette(Enum):
     BACKGROUND = (12, 12, 24)        # near-black with blue tint
     PANEL = (28, 28, 48)             # deep indigo (slightly lighter)
@@ -37,34 +39,48 @@ class Settings:
         self.squarewidth = self.BOARD_WIDTH/self.BOARD_SIZE
         self.squareheight = self.BOARD_HEIGHT/self.BOARD_SIZE
         self.frame_rate = 30
+        # While idle the main loop sleeps until an event arrives or this many ms pass
+        self.idle_timeout = 1000
         self.title = "PyChuss"
         self.icon = "icon.png"
         self.next_move_icon = "assets/move.png"
-        self.squareColors = [(181, 136, 99), (240, 217, 181)]
+        # Board themes as [dark, light] square colours
+        self.board_themes = {
+            "classic": [(181, 136, 99), (240, 217, 181)],
+            "slate": [(84, 98, 122), (190, 200, 214)],
+            "forest": [(118, 150, 86), (238, 238, 210)],
+        }
+        self.board_theme = "classic"
+        self.squareColors = self.board_themes[self.board_theme]
+        self.show_coordinates = True
+        self.coordinates_font = "assets/font/PressStart2P.ttf"
+        # Mark the side to move's pieces that lose material if captured (SEE)
+        self.show_hanging_pieces = True
+        # Position every new game starts from (e.g. a puzzle); see main.py --fen
+        self.start_fen = STARTING_FEN
+        # Colours played by the engine; empty for two humans
+        self.computer_colors: tuple[str, ...] = ()
+        # Engine budget per move: the first limit reached ends the search
+        self.engine_time_limit = 2.0
+        self.engine_max_depth = 64
+        self.engine_node_limit: int | None = None
+        # Transposition table size; fixed for the life of the computer player
+        self.engine_hash_mb = 16
+        # Search processes (Lazy SMP over a shared table); 1 searches on a thread only
+        self.engine_workers = 1
+        # Polyglot book (python -m Rules.polyglot build) for the engine and the
+        # opening explorer; ignored if the file does not exist
+        self.opening_book: str | None = "assets/book.bin"
+        # "weighted" picks book moves at random by weight, "best" the heaviest
+        self.book_mode = "weighted"
+        # Endgame tables (python -m Rules.tablebase generate); ignored if missing
+        self.tablebase_dir = "tablebases"
+        # Show the tablebase result and best move in solved endgames
+        self.show_endgame_hints = True
 
         self.emptyboard = [[None for col in range(
             self.BOARD_SIZE)] for row in range(self.BOARD_SIZE)]
         self.padding = 2
-        self.directions = {
-            "up": (-1, 0),
-            "down": (1, 0),
-            "left": (0, -1),
-            "right": (0, 1),
-            "up_left": (-1, -1),
-            "up_right": (-1, 1),
-            "down_left": (1, -1),
-            "down_right": (1, 1),
-            "knight": [(2, 1), (2, -1), (-2, 1), (-2, -1),
-                       (1, 2), (1, -2), (-1, 2), (-1, -2)]
-        }
-
-        self.tiles = [pygame.Surface(
-            (self.squarewidth, self.squareheight)),
-            pygame.Surface(
-            (self.squarewidth, self.squareheight))]
-
-        self.tiles[0].fill(self.squareColors[0])
-        self.tiles[1].fill(self.squareColors[1])
 
 
 # seti = Settings()
@@ -0,0 +1,52 @@
+import os
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+# Sprites and fonts are loaded relative to the repository root
+os.chdir(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from main import Game
+from Rules.bitboard import COLOR_NAMES, PIECE_NAMES, from_coords, to_coords
+from Rules.move import to_uci
+
+
+def play(scene, uci: str) -> None:
+    move = next(m for m in scene.board.position.legal_moves() if to_uci(m) == uci)
+    scene.board.play_move(move, scene)
+    scene.get_current_player().turn_complete = True
+    scene.change_turn()
+
+
+def assert_sprites_match(scene) -> None:
+    board = scene.board
+    on_board = [piece_id for rank in board.board for piece_id in rank if piece_id is not None]
+    assert len(on_board) == len(set(on_board)) == len(board.pieces)
+    assert not set(board.off_board) & set(board.pieces)
+    for sq, code in enumerate(board.position.mailbox):
+        piece = board.get_piece(coords=to_coords(sq))
+        if code is None:
+            assert piece is None
+            continue
+        color, ptype = divmod(code, 6)
+        assert (piece.color, piece.type) == (COLOR_NAMES[color], PIECE_NAMES[ptype])
+        assert from_coords(piece.pos) == sq
+    for player in scene.players:
+        assert sorted(player.pieces) == sorted(
+            piece_id for piece_id, piece in board.pieces.items() if piece.color == player.color)
+
+
+def test_promoting_twice_after_takeback_keeps_sprites_unique():
+    game = Game("4k3/P7/8/8/8/8/8/r2QK3 w - - 0 1")
+    # Two human players; Game.play() would also set a cursor, which needs a real display
+    game.settings.computer_colors = ()
+    scene = game.gamescene
+    scene.restart()
+    play(scene, "a7a8q")
+    scene.takeback()
+    play(scene, "a7a8q")
+    play(scene, "e8e7")
+    play(scene, "a8b8")
+    play(scene, "a1d1")
+    scene.takeback()
+    assert_sprites_match(scene)
+    assert "white_queen" in scene.board.pieces